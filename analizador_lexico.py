@@ -2,8 +2,14 @@
 Analizador Léxico - Tokenización de la entrada
 """
 
+import re
 from tabulate import tabulate
 from grammar import MAPEO_DIVISAS
+from instrumentacion import instrumentado
+from sugerencias import sugerir_divisas
+
+
+FECHA = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
 
 
 class AnalizadorLexico:
@@ -13,6 +19,7 @@ class AnalizadorLexico:
         self.entrada = entrada
         self.tokens = []
         
+    @instrumentado('lexico.analizar')
     def analizar(self):
         """Tokeniza la entrada y genera tabla de tokens"""
         palabras = self.entrada.strip().split()
@@ -51,6 +58,22 @@ class AnalizadorLexico:
                     'valor': palabra,
                     'descripcion': 'Indicador de conversión'
                 })
+            elif palabra.lower() == 'el':
+                self.tokens.append({
+                    'linea': linea,
+                    'posicion': posicion,
+                    'tipo': 'PREPOSICION',
+                    'valor': palabra,
+                    'descripcion': 'Indicador de fecha'
+                })
+            elif FECHA.fullmatch(palabra):
+                self.tokens.append({
+                    'linea': linea,
+                    'posicion': posicion,
+                    'tipo': 'FECHA',
+                    'valor': palabra,
+                    'descripcion': 'Fecha de las tasas'
+                })
             elif palabra in MAPEO_DIVISAS:
                 self.tokens.append({
                     'linea': linea,
@@ -60,12 +83,16 @@ class AnalizadorLexico:
                     'descripcion': f'Moneda: {MAPEO_DIVISAS[palabra]["nombre"]}'
                 })
             else:
+                sugerencias = sugerir_divisas(palabra)
+                descripcion = 'Token no reconocido'
+                if sugerencias:
+                    descripcion += f" (¿quiso decir {' o '.join(sugerencias)}?)"
                 self.tokens.append({
                     'linea': linea,
                     'posicion': posicion,
                     'tipo': 'DESCONOCIDO',
                     'valor': palabra,
-                    'descripcion': 'Token no reconocido'
+                    'descripcion': descripcion
                 })
         
         return self.tokens
@@ -78,6 +105,7 @@ class AnalizadorLexico:
         except ValueError:
             return False
     
+    @instrumentado('lexico.tabla')
     def obtener_tabla_texto(self):
         """Retorna la tabla de análisis léxico como texto"""
         tabla = [[t['linea'], t['posicion'], t['tipo'], t['valor'], t['descripcion']] 
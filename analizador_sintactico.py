@@ -2,8 +2,48 @@
 Analizador Sintáctico - Construcción del árbol sintáctico
 """
 
-from lark import Lark
-from grammar import GRAMMAR
+from datetime import date
+from lark import Lark, Token
+from lark.exceptions import UnexpectedInput, UnexpectedToken
+from grammar import GRAMMAR, MAPEO_DIVISAS
+from instrumentacion import instrumentado
+from sugerencias import es_parecida, sugerir_divisas
+
+
+_parser = None
+
+# Nombre de cada terminal de la gramática para los mensajes de error
+TERMINALES = {
+    'CONVERTIR': "'convertir'",
+    'NUMERO': 'una cantidad',
+    'DIVISA': 'una divisa',
+    'A': "'a'",
+    'EL': "'el'",
+    'FECHA': 'una fecha (AAAA-MM-DD)',
+    'DOLLAR': "'$'",
+    '$END': 'el fin de la entrada',
+    '<END-OF-FILE>': 'el fin de la entrada'
+}
+
+# Valor de relleno para los terminales insertados al recuperarse de un error
+RELLENO = {'CONVERTIR': 'convertir', 'NUMERO': '0', 'DIVISA': 'Euro', 'A': 'a',
+           'EL': 'el', 'FECHA': '2000-01-01', 'DOLLAR': '$'}
+
+PALABRAS_CLAVE = ('CONVERTIR', 'A', 'EL')
+
+
+@instrumentado('sintactico.construir_lark')
+def construir_parser():
+    """Construye un parser nuevo a partir de la gramática"""
+    return Lark(GRAMMAR, start='start', parser='lalr')
+
+
+def obtener_parser():
+    """Retorna el parser compartido (construir Lark es costoso)"""
+    global _parser
+    if _parser is None:
+        _parser = construir_parser()
+    return _parser
 
 
 class AnalizadorSintactico:
@@ -11,19 +51,128 @@ class AnalizadorSintactico:
     
     def __init__(self, entrada):
         self.entrada = entrada
-        self.parser = Lark(GRAMMAR, start='start')
+        self.parser = obtener_parser()
         self.arbol = None
         self.error = None
+        self.errores = []
         
+    @instrumentado('sintactico.analizar')
     def analizar(self):
-        """Parsea la entrada y genera el AST"""
+        """
+        Parsea la entrada y genera el AST. Ante un error el parser se recupera
+        y sigue, de modo que self.errores contiene todos los errores de la
+        sentencia con su posición y, cuando las hay, sugerencias.
+        """
+        self.errores = []
+        self._ultimo_error = None
+        self._apilados_en_error = -1
         try:
-            self.arbol = self.parser.parse(self.entrada)
-            return True
-        except Exception as e:
-            self.error = str(e)
+            arbol = self.parser.parse(self.entrada, on_error=self._recuperar)
+        except UnexpectedInput as e:
+            # Error del que no hay recuperación posible
+            if e is not self._ultimo_error:
+                self._registrar_error(e)
+            arbol = None
+
+        if arbol is not None:
+            reportados = {(error['linea'], error['columna']) for error in self.errores}
+            for token in arbol.children:
+                if (token.type == 'DIVISA' and token.value not in MAPEO_DIVISAS
+                        and (token.line, token.column) not in reportados):
+                    self.errores.append({
+                        'linea': token.line,
+                        'columna': token.column,
+                        'mensaje': f"Divisa desconocida '{token.value}'",
+                        'sugerencias': sugerir_divisas(token.value)
+                    })
+                elif token.type == 'FECHA' and (token.line, token.column) not in reportados:
+                    try:
+                        date.fromisoformat(token.value)
+                    except ValueError:
+                        self.errores.append({
+                            'linea': token.line,
+                            'columna': token.column,
+                            'mensaje': f"Fecha inválida '{token.value}'",
+                            'sugerencias': []
+                        })
+
+        if self.errores:
+            self.errores.sort(key=lambda error: (error['linea'], error['columna']))
+            self.error = formatear_errores(self.errores)
             return False
-    
+
+        self.arbol = arbol
+        return True
+
+    def _recuperar(self, e):
+        """
+        Manejador de errores de Lark. Según el caso se reemplaza la palabra
+        mal escrita, se inserta el terminal que faltaba o se descarta el token.
+        """
+        self._ultimo_error = e
+        parser = e.interactive_parser
+        apilados = len(parser.parser_state.value_stack)
+
+        # Como en yacc, hasta que el parser consuma al menos un token real tras
+        # un error los tokens inesperados se descartan sin reportarse; así no hay
+        # errores en cascada
+        reportar = apilados > self._apilados_en_error
+        if reportar:
+            self._registrar_error(e)
+        if not isinstance(e, UnexpectedToken):
+            self._apilados_en_error = apilados
+            return True
+
+        esperado = _unico_esperado(parser)
+        if e.token.type == '$END':
+            # Completar la sentencia mientras el siguiente terminal sea inequívoco
+            while esperado and '$END' not in parser.accepts():
+                parser.feed_token(Token(esperado, RELLENO[esperado]))
+                esperado = _unico_esperado(parser)
+            return '$END' in parser.accepts()
+        if not reportar:
+            return True
+
+        if esperado in PALABRAS_CLAVE and es_parecida(e.token.value, RELLENO[esperado]):
+            parser.feed_token(Token(esperado, RELLENO[esperado]))
+        elif esperado:
+            prueba = parser.copy()
+            prueba.feed_token(Token(esperado, RELLENO[esperado]))
+            if e.token.type in prueba.accepts():
+                parser.feed_token(Token(esperado, RELLENO[esperado]))
+                self._apilados_en_error = len(parser.parser_state.value_stack)
+                parser.feed_token(e.token)
+                return True
+
+        self._apilados_en_error = len(parser.parser_state.value_stack)
+        return True
+
+    def _registrar_error(self, e):
+        if isinstance(e, UnexpectedToken):
+            esperados = sorted(TERMINALES.get(t, t) for t in e.expected)
+            error = {
+                'linea': e.line,
+                'columna': e.column,
+                'mensaje': f"Se esperaba {' o '.join(esperados)}",
+                'sugerencias': [RELLENO[t] for t in e.expected
+                                if t in PALABRAS_CLAVE and es_parecida(e.token.value, RELLENO[t])]
+            }
+            if e.token.type == '$END':
+                # Lark ubica el fin de la entrada en la columna 1; se reporta tras el último carácter
+                lineas = self.entrada.rstrip().split('\n')
+                error.update(linea=len(lineas), columna=len(lineas[-1]) + 1,
+                             mensaje=error['mensaje'] + ' y terminó la entrada')
+            else:
+                error['mensaje'] += f" y se encontró '{e.token.value}'"
+        else:
+            error = {
+                'linea': e.line,
+                'columna': e.column,
+                'mensaje': f"Carácter no válido '{self.entrada[e.pos_in_stream]}'",
+                'sugerencias': []
+            }
+        self.errores.append(error)
+
     def obtener_arbol_texto(self):
         """Retorna el árbol sintáctico como texto"""
         if not self.arbol:
@@ -40,8 +189,35 @@ class AnalizadorSintactico:
         origen = hijos[1].value
         destino = hijos[2].value
         
+        # Sin fecha la conversión usa las tasas actuales
+        fecha = hijos[3].value if len(hijos) > 3 else None
+        
         return {
             'cantidad': cantidad,
+            'cantidad_texto': hijos[0].value,
             'origen': origen,
-            'destino': destino
-        }
\ No newline at end of file
+            'destino': destino,
+            'fecha': fecha
+        }
+
+
+def _unico_esperado(parser):
+    """Terminal que el parser acepta a continuación, si es el único posible"""
+    aceptados = parser.accepts() - {'$END'}
+    return next(iter(aceptados)) if len(aceptados) == 1 and aceptados <= RELLENO.keys() else None
+
+
+def formatear_errores(errores, linea_base=1, columna_base=1):
+    """
+    Texto con un error por línea. linea_base y columna_base (dónde empieza la
+    sentencia) permiten reportar posiciones absolutas cuando la sentencia
+    proviene de un archivo; la columna solo se desplaza en la primera línea.
+    """
+    partes = []
+    for error in errores:
+        columna = error['columna'] + (columna_base - 1 if error['linea'] == 1 else 0)
+        texto = f"Línea {error['linea'] + linea_base - 1}, columna {columna}: {error['mensaje']}"
+        if error['sugerencias']:
+            texto += f" (¿quiso decir {' o '.join(error['sugerencias'])}?)"
+        partes.append(texto)
+    return '\n'.join(partes)
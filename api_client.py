@@ -2,56 +2,90 @@
 Cliente API para obtener tasas de cambio en tiempo real
 """
 
+import itertools
+import math
+import threading
+import numpy as np
 import requests
 from datetime import datetime, timedelta
+from fractions import Fraction
 from grammar import MAPEO_DIVISAS
+from registro_divisas import CRYPTO_IDS, TASAS_RESPALDO, PRECIOS_RESPALDO
+from grafo_divisas import GrafoDivisas, SinCotizacionError
+from historial_tasas import AlmacenTasas
+import historico
+from instrumentacion import REGISTRO, instrumentado
+from gobernador import GOBERNADOR
 
 
 class APITasasCambio:
     """Cliente para obtener tasas de cambio en tiempo real"""
     
+    # Identificadores que no se reutilizan, a diferencia de id(), para claves de cache
+    _instancias = itertools.count()
+    
     def __init__(self):
+        self.instancia = next(self._instancias)
         self.base_url = "https://api.exchangerate-api.com/v4/latest/"
         self.base_url_historico = "https://api.exchangerate.host"
         self.base_url_crypto = "https://api.coingecko.com/api/v3"
         self.tasas_cache = None
         self.tasas_crypto_cache = None
         self.ultima_actualizacion = None
+        self.pares_directos = {}
+        self.version_tasas = 0
+        self._grafo = None
+        self._version_grafo = -1
+        self._valores_exactos = None
+        self._version_exactos = -1
+        self.gobernador = GOBERNADOR
+        self._bloqueo = threading.RLock()
+        self._suscriptores = []
+        
+        # Si se asigna un historico.ProveedorReplay, los históricos se leen de disco
+        self.proveedor_historico = None
+        self.semilla_simulacion = 0
+        
+        # Tasas reales ya vistas, por fecha, para convertir a una fecha sin usar la red
+        self.historial = AlmacenTasas()
+        
+        # Motivo por el que se están sirviendo datos de respaldo, por fuente
+        self.avisos = {}
         
         # Mapeo de códigos a IDs de CoinGecko
-        self.crypto_ids = {
-            'BTC': 'bitcoin',
-            'ETH': 'ethereum',
-            'USDT': 'tether',
-            'BNB': 'binancecoin',
-            'ADA': 'cardano',
-            'XRP': 'ripple',
-            'SOL': 'solana',
-            'DOGE': 'dogecoin'
-        }
+        self.crypto_ids = dict(CRYPTO_IDS)
     
+    @instrumentado('api.obtener_tasas')
     def obtener_tasas(self, moneda_base='USD'):
         """Obtiene las tasas de cambio desde la API"""
         try:
             url = f"{self.base_url}{moneda_base}"
-            response = requests.get(url, timeout=10)
+            response = self.gobernador.get('exchangerate', url, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
                 self.tasas_cache = data['rates']
                 self.ultima_actualizacion = datetime.now()
+                self.avisos.pop('fiat', None)
+                self._snapshot_actualizado()
                 
                 # Obtener tasas de criptomonedas
                 self._obtener_tasas_crypto()
                 
+                if moneda_base == 'USD':
+                    self._registrar_en_historial()
                 return self.tasas_cache, None
             else:
-                return None, f"Error al obtener tasas: Status {response.status_code}"
+                error = f"Error al obtener tasas: Status {response.status_code}"
         except requests.RequestException as e:
-            return self._tasas_respaldo(), f"Error de conexión: {e}"
+            error = f"Error de conexión: {e}"
         except Exception as e:
-            return self._tasas_respaldo(), f"Error inesperado: {e}"
+            error = f"Error inesperado: {e}"
+        
+        self._registrar_respaldo('fiat', error)
+        return self.tasas_cache or self._tasas_respaldo(), error
     
+    @instrumentado('api.obtener_tasas_crypto')
     def _obtener_tasas_crypto(self):
         """Obtiene las tasas de criptomonedas desde CoinGecko"""
         try:
@@ -63,7 +97,7 @@ class APITasasCambio:
                 'vs_currencies': 'usd'
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self.gobernador.get('coingecko', url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -76,109 +110,219 @@ class APITasasCambio:
                     if coin_id in data and 'usd' in data[coin_id]:
                         # Precio en USD por unidad de crypto
                         self.tasas_crypto_cache[code] = data[coin_id]['usd']
-        except:
-            # Si falla, usar tasas de respaldo
+                self.avisos.pop('crypto', None)
+                self._snapshot_actualizado()
+                return
+            error = f"CoinGecko respondió con status {response.status_code}"
+        except requests.RequestException as e:
+            error = f"Error de conexión con CoinGecko: {e}"
+        except (ValueError, KeyError, TypeError) as e:
+            error = f"Respuesta inválida de CoinGecko: {e}"
+        
+        self._registrar_respaldo('crypto', error)
+    
+    def _registrar_en_historial(self):
+        """Guarda las tasas recién obtenidas como las del día (sin los datos de respaldo)"""
+        unidades_por_usd = dict(self.tasas_cache)
+        if 'crypto' not in self.avisos:
+            unidades_por_usd.update({codigo: 1 / precio for codigo, precio in self.tasas_crypto_cache.items()
+                                     if precio})
+        self.historial.registrar_snapshot(np.datetime64('today', 'D'), unidades_por_usd)
+    
+    def _registrar_respaldo(self, fuente, error):
+        """
+        Deja constancia de que una fuente no se pudo actualizar. Si ya había
+        datos reales se conservan (desactualizados); si no, se usan los de respaldo.
+        """
+        REGISTRO.incrementar(f"api.respaldo.{fuente}")
+        if fuente == 'crypto' and not self.tasas_crypto_cache:
             self.tasas_crypto_cache = self._tasas_crypto_respaldo()
+            self._snapshot_actualizado()
+            self.avisos[fuente] = f"Precios crypto de respaldo: {error}"
+        elif fuente == 'fiat' and not self.tasas_cache:
+            self.avisos[fuente] = f"Tasas fiat de respaldo: {error}"
+        else:
+            self.avisos[fuente] = f"Tasas {fuente} desactualizadas: {error}"
+    
+    def avisos_respaldo(self):
+        """Lista de fuentes que no están sirviendo datos actualizados"""
+        return list(self.avisos.values())
     
     def _tasas_respaldo(self):
         """Tasas de respaldo en caso de fallo de la API"""
-        return {
-            'USD': 1.0, # Dolar EstadoUnidense
-            'HNL': 26.23, # Lempira Hondureño
-            'EUR': 0.86, #Euro
-            'GBP': 0.79, # Libra Esterlina
-            'GTQ': 7.80 # Quetzal Guatemalteco
-        }
+        return dict(TASAS_RESPALDO)
     
     def _tasas_crypto_respaldo(self):
         """Tasas de criptomonedas de respaldo"""
-        return {
-            'BTC': 45000.0, #Bitcoin
-            'ETH': 2500.0, # Ethereum
-            'USDT': 1.0,  #Tether 
-            'BNB': 320.0, # BinanceCoin
-            'ADA': 0.45, # Cardano
-            'XRP': 0.55, #Ripple
-            'SOL': 100.0, # Solana
-            'DOGE': 0.08  #DogeCoin
-        }
+        return dict(PRECIOS_RESPALDO)
     
-    def convertir(self, cantidad, desde, hacia):
-        """Convierte una cantidad de una divisa a otra"""
+    def agregar_par_directo(self, desde, hacia, tasa):
+        """Registra una cotización directa entre dos códigos (1 desde = tasa hacia)"""
+        self.pares_directos[(desde, hacia)] = tasa
+        self._snapshot_actualizado()
+    
+    def _snapshot_actualizado(self):
+        """Marca que las cotizaciones cambiaron y el grafo debe reconstruirse"""
+        self.version_tasas += 1
+    
+    def suscribir(self, funcion):
+        """Registra funcion(codigos) para ser avisada cuando cambian precios en vivo"""
+        self._suscriptores.append(funcion)
+    
+    def desuscribir(self, funcion):
+        """Deja de avisar a una función registrada con suscribir"""
+        if funcion in self._suscriptores:
+            self._suscriptores.remove(funcion)
+    
+    def aplicar_precios_crypto(self, precios):
+        """
+        Aplica una actualización parcial {codigo: precio_usd}. Si el grafo ya
+        está construido solo se recalculan las tasas cruzadas que dependen
+        de las divisas modificadas, sin reconstruirlo. Los eventos que no son
+        un diccionario y los precios que no son números positivos finitos se
+        ignoran.
+        """
+        if not isinstance(precios, dict):
+            return set()
+        
+        with self._bloqueo:
+            if self.tasas_crypto_cache is None:
+                self.tasas_crypto_cache = {}
+            
+            grafo_vigente = self._grafo is not None and self._version_grafo == self.version_tasas
+            cambiados = set()
+            for codigo, precio in precios.items():
+                if self._precio_valido(precio) and self.tasas_crypto_cache.get(codigo) != precio:
+                    self.tasas_crypto_cache[codigo] = precio
+                    cambiados.add(codigo)
+                    if grafo_vigente:
+                        self._grafo.actualizar_cotizacion(codigo, 'USD', precio)
+            
+            if not cambiados:
+                return cambiados
+            
+            self.avisos.pop('crypto', None)
+            self._snapshot_actualizado()
+            if grafo_vigente:
+                self._version_grafo = self.version_tasas
+        
+        REGISTRO.incrementar('api.precios_en_vivo', len(cambiados))
+        for funcion in list(self._suscriptores):
+            funcion(cambiados)
+        return cambiados
+    
+    @staticmethod
+    def _precio_valido(precio):
+        """Indica si un precio recibido en vivo es un número positivo y finito"""
+        return (isinstance(precio, (int, float)) and not isinstance(precio, bool)
+                and math.isfinite(precio) and precio > 0)
+    
+    def _asegurar_tasas(self):
+        """Carga las tasas si aún no se tienen"""
         if not self.tasas_cache:
             self.obtener_tasas()
         
         if not self.tasas_crypto_cache:
             self.tasas_crypto_cache = self._tasas_crypto_respaldo()
+            self.avisos['crypto'] = "Precios crypto de respaldo: aún no se consultó CoinGecko"
+            self._snapshot_actualizado()
+    
+    def _construir_grafo(self, numero=float):
+        """Construye el grafo con todas las cotizaciones disponibles"""
+        return GrafoDivisas.desde_snapshot(self.tasas_cache or self._tasas_respaldo(),
+                                           self.tasas_crypto_cache,
+                                           self.pares_directos,
+                                           numero)
+    
+    def obtener_grafo(self):
+        """Retorna el grafo del snapshot actual, reconstruyéndolo solo si cambió"""
+        self._asegurar_tasas()
+        
+        with self._bloqueo:
+            if self._grafo is None or self._version_grafo != self.version_tasas:
+                with REGISTRO.medir('api.construir_grafo'):
+                    version = self.version_tasas
+                    self._grafo = self._construir_grafo()
+                    self._grafo.precalcular()
+                self._version_grafo = version
+            return self._grafo
+    
+    def tasas_en_usd(self, exacto=False):
+        """
+        Retorna el valor en USD de una unidad de cada divisa conocida.
+        Con exacto=True los valores son Fraction construidas a partir del
+        decimal publicado por la API, sin el error de la división en float.
+        Los valores exactos se comparten entre llamadas y no deben modificarse.
+        """
+        if exacto:
+            return self._valores_exactos_en_usd()
+        return self.obtener_grafo().valores_en('USD')
+    
+    def _valores_exactos_en_usd(self):
+        """Valores exactos del snapshot actual; como el grafo, se recalculan solo si cambió"""
+        self._asegurar_tasas()
+        
+        with self._bloqueo:
+            if self._valores_exactos is None or self._version_exactos != self.version_tasas:
+                with REGISTRO.medir('api.valores_exactos'):
+                    version = self.version_tasas
+                    grafo = self._construir_grafo(lambda valor: Fraction(str(valor)))
+                    self._valores_exactos = grafo.valores_en('USD')
+                self._version_exactos = version
+            return self._valores_exactos
+    
+    @instrumentado('api.convertir')
+    def convertir(self, cantidad, desde, hacia):
+        """Convierte una cantidad de una divisa a otra"""
+        grafo = self.obtener_grafo()
         
         codigo_desde = MAPEO_DIVISAS[desde]['code']
         codigo_hacia = MAPEO_DIVISAS[hacia]['code']
-        tipo_desde = MAPEO_DIVISAS[desde]['tipo']
-        tipo_hacia = MAPEO_DIVISAS[hacia]['tipo']
-        
-        # Determinar la cantidad en USD primero
-        if tipo_desde == 'crypto':
-            # De crypto a USD
-            precio_usd = self.tasas_crypto_cache.get(codigo_desde, 0)
-            cantidad_usd = cantidad * precio_usd
-        elif codigo_desde != 'USD':
-            # De fiat (no USD) a USD
-            cantidad_usd = cantidad / self.tasas_cache[codigo_desde]
-        else:
-            # Ya está en USD
-            cantidad_usd = cantidad
-        
-        # Convertir de USD a la moneda destino
-        if tipo_hacia == 'crypto':
-            # De USD a crypto
-            precio_usd = self.tasas_crypto_cache.get(codigo_hacia, 1)
-            resultado = cantidad_usd / precio_usd if precio_usd > 0 else 0
-        elif codigo_hacia != 'USD':
-            # De USD a fiat (no USD)
-            resultado = cantidad_usd * self.tasas_cache[codigo_hacia]
-        else:
-            # Ya está en USD
-            resultado = cantidad_usd
-        
-        # Calcular tasa directa
-        if tipo_desde == 'crypto' and tipo_hacia == 'crypto':
-            # Crypto a Crypto
-            precio_desde = self.tasas_crypto_cache.get(codigo_desde, 1)
-            precio_hacia = self.tasas_crypto_cache.get(codigo_hacia, 1)
-            tasa_directa = precio_desde / precio_hacia if precio_hacia > 0 else 0
-        elif tipo_desde == 'crypto':
-            # Crypto a Fiat
-            precio_crypto = self.tasas_crypto_cache.get(codigo_desde, 0)
-            if codigo_hacia == 'USD':
-                tasa_directa = precio_crypto
-            else:
-                tasa_directa = precio_crypto * self.tasas_cache[codigo_hacia]
-        elif tipo_hacia == 'crypto':
-            # Fiat a Crypto
-            precio_crypto = self.tasas_crypto_cache.get(codigo_hacia, 1)
-            if codigo_desde == 'USD':
-                tasa_directa = 1 / precio_crypto if precio_crypto > 0 else 0
-            else:
-                tasa_usd_desde = 1 / self.tasas_cache[codigo_desde]
-                tasa_directa = tasa_usd_desde / precio_crypto if precio_crypto > 0 else 0
-        else:
-            # Fiat a Fiat
-            tasa_directa = self.tasas_cache[codigo_hacia] / self.tasas_cache[codigo_desde]
+        
+        # La ruta evita cotizaciones faltantes; si no existe se lanza SinCotizacionError
+        tasa_directa = grafo.tasa(codigo_desde, codigo_hacia)
+        tasas_fiat = self.tasas_cache or self._tasas_respaldo()
         
         return {
-            'resultado': resultado,
+            'resultado': cantidad * tasa_directa,
             'tasa': tasa_directa,
+            'ruta': grafo.ruta(codigo_desde, codigo_hacia),
             'tasas_usadas': {
-                codigo_desde: self.tasas_crypto_cache.get(codigo_desde) if tipo_desde == 'crypto' else self.tasas_cache.get(codigo_desde, 1),
-                codigo_hacia: self.tasas_crypto_cache.get(codigo_hacia) if tipo_hacia == 'crypto' else self.tasas_cache.get(codigo_hacia, 1)
+                codigo: self.tasas_crypto_cache.get(codigo) if MAPEO_DIVISAS[clave]['tipo'] == 'crypto' else tasas_fiat.get(codigo)
+                for clave, codigo in ((desde, codigo_desde), (hacia, codigo_hacia))
             }
         }
     
+    @instrumentado('api.convertir_en_fecha')
+    def convertir_en_fecha(self, cantidad, desde, hacia, fecha):
+        """
+        Convierte con las tasas vigentes en una fecha, buscadas en el historial
+        en memoria sin consultar la red. Se usa la última tasa registrada hasta
+        ese día; si no hay ninguna se lanza SinCotizacionError.
+        """
+        codigo_desde = MAPEO_DIVISAS[desde]['code']
+        codigo_hacia = MAPEO_DIVISAS[hacia]['code']
+        tasa = self.historial.tasa(codigo_desde, codigo_hacia, fecha)
+        
+        return {
+            'resultado': cantidad * tasa,
+            'tasa': tasa,
+            'fecha': str(fecha)
+        }
+    
+    @instrumentado('api.obtener_historico')
     def obtener_historico(self, desde, hacia, dias=30):
         """Obtiene el histórico de tasas de cambio para graficar"""
         codigo_desde = MAPEO_DIVISAS[desde]['code']
         codigo_hacia = MAPEO_DIVISAS[hacia]['code']
         
+        if self.proveedor_historico is not None:
+            try:
+                return self.proveedor_historico.obtener_historico(codigo_desde, codigo_hacia, dias), None
+            except SinCotizacionError as e:
+                return self._generar_datos_simulados(codigo_desde, codigo_hacia, dias,
+                                                     f"{e} (usando datos simulados)")
+        
         datos_historicos = []
         fecha_fin = datetime.now()
         fecha_inicio = fecha_fin - timedelta(days=dias)
@@ -193,7 +337,7 @@ class APITasasCambio:
                 'symbols': codigo_hacia
             }
             
-            response = requests.get(url, params=params, timeout=15)
+            response = self.gobernador.get('exchangerate_host', url, params=params, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -206,37 +350,126 @@ class APITasasCambio:
                                 'fecha_str': fecha_str,
                                 'tasa': tasas[codigo_hacia]
                             })
+                    self.historial.registrar(codigo_desde, codigo_hacia,
+                                             [d['fecha_str'] for d in datos_historicos],
+                                             [d['tasa'] for d in datos_historicos])
                     return datos_historicos, None
             
             # Si falla, generar datos simulados
-            return self._generar_datos_simulados(dias), "Usando datos simulados (API no disponible)"
+            return self._generar_datos_simulados(codigo_desde, codigo_hacia, dias,
+                                                 "Usando datos simulados (API no disponible)")
             
         except Exception as e:
-            return self._generar_datos_simulados(dias), f"Error: {str(e)}"
+            return self._generar_datos_simulados(codigo_desde, codigo_hacia, dias, f"Error: {str(e)}")
     
-    def _generar_datos_simulados(self, dias):
-        """Genera datos históricos simulados con variación realista"""
-        import random
+    @instrumentado('api.obtener_historico_multiple')
+    def obtener_historico_multiple(self, desde, hacias, dias=30):
+        """
+        Históricos de una divisa contra varias con una sola solicitud.
+        Retorna (fechas, {clave: arreglo de tasas}, error), con fechas como
+        datetime64[D]; las series que el proveedor no tiene se simulan, y las
+        que tampoco tienen tasa actual para anclarlas se omiten.
+        """
+        codigo_desde = MAPEO_DIVISAS[desde]['code']
+        codigos = {clave: MAPEO_DIVISAS[clave]['code'] for clave in hacias}
+        fechas, columnas, error = None, {}, None
         
-        datos = []
-        fecha_actual = datetime.now()
+        try:
+            if self.proveedor_historico is not None:
+                fechas, columnas = self.proveedor_historico.obtener_tabla(
+                    codigo_desde, list(codigos.values()), dias)
+            else:
+                fechas, columnas = self._historico_multiple_api(codigo_desde, list(codigos.values()), dias)
+                self.historial.registrar_tabla(fechas, columnas, base=codigo_desde)
+        except (requests.RequestException, SinCotizacionError, ValueError) as e:
+            error = f"Error: {e}"
         
-        # Obtener tasa base actual
-        if not self.tasas_cache:
-            self.obtener_tasas()
+        if fechas is None or not len(fechas):
+            columnas = {}
         
-        # Generar variaciones aleatorias realistas
-        tasa_base = 1.0
-        for i in range(dias, -1, -1):
-            fecha = fecha_actual - timedelta(days=i)
-            # Variación aleatoria de ±2%
-            variacion = random.uniform(-0.02, 0.02)
-            tasa_base = tasa_base * (1 + variacion)
+        faltantes = [c for c in codigos.values() if c not in columnas]
+        if faltantes:
+            if columnas:
+                # Las series simuladas toman las mismas fechas que las reales, con sus huecos
+                _, simuladas = self._generar_series_simuladas(codigo_desde, faltantes, len(fechas) - 1,
+                                                              fechas[-1])
+            else:
+                fechas, simuladas = self._generar_series_simuladas(codigo_desde, faltantes, dias)
+            columnas.update(simuladas)
             
-            datos.append({
-                'fecha': fecha,
-                'fecha_str': fecha.strftime('%Y-%m-%d'),
-                'tasa': tasa_base
-            })
+            avisos = [error] if error else []
+            if simuladas:
+                avisos.append(f"Usando datos simulados para {', '.join(simuladas)}")
+            sin_ancla = [c for c in faltantes if c not in simuladas]
+            if sin_ancla:
+                avisos.append(f"Sin tasa actual para anclar la simulación de {', '.join(sin_ancla)}")
+            error = '; '.join(avisos)
         
-        return datos
\ No newline at end of file
+        return fechas, {clave: columnas[codigo] for clave, codigo in codigos.items() if codigo in columnas}, error
+    
+    def _historico_multiple_api(self, codigo_desde, codigos_hacia, dias):
+        """Consulta la serie de tiempo de todos los símbolos en una sola solicitud"""
+        fecha_fin = datetime.now()
+        params = {
+            'start_date': (fecha_fin - timedelta(days=dias)).strftime('%Y-%m-%d'),
+            'end_date': fecha_fin.strftime('%Y-%m-%d'),
+            'base': codigo_desde,
+            'symbols': ','.join(codigos_hacia)
+        }
+        response = self.gobernador.get('exchangerate_host', f"{self.base_url_historico}/timeseries",
+                                       params=params, timeout=15)
+        
+        data = response.json() if response.status_code == 200 else {}
+        if not data.get('success') or not data.get('rates'):
+            raise ValueError("API de históricos no disponible")
+        
+        fechas_str = sorted(data['rates'])
+        tabla = np.array([[data['rates'][f].get(c, np.nan) for c in codigos_hacia] for f in fechas_str],
+                         dtype=np.float64)
+        
+        # Un símbolo sin ningún dato se trata como no disponible
+        columnas = {c: tabla[:, i] for i, c in enumerate(codigos_hacia) if not np.isnan(tabla[:, i]).all()}
+        return np.array(fechas_str, dtype='datetime64[D]'), columnas
+    
+    def _grafo_en_memoria(self):
+        """Grafo con las cotizaciones ya cargadas (o las de respaldo), sin consultar las APIs"""
+        with self._bloqueo:
+            if self._grafo is not None and self._version_grafo == self.version_tasas:
+                return self._grafo
+            return GrafoDivisas.desde_snapshot(self.tasas_cache or self._tasas_respaldo(),
+                                               self.tasas_crypto_cache or self._tasas_crypto_respaldo(),
+                                               self.pares_directos)
+    
+    def _tasa_en_memoria(self, grafo, codigo_desde, codigo_hacia):
+        """Tasa actual del par para anclar una simulación, o None si no hay cotización"""
+        try:
+            return grafo.tasa(codigo_desde, codigo_hacia)
+        except SinCotizacionError:
+            return None
+    
+    def _generar_series_simuladas(self, codigo_desde, codigos_hacia, dias, fin=None):
+        """
+        Series sintéticas de una divisa contra varias, ancladas en las tasas
+        actuales. Las divisas sin tasa actual no se simulan.
+        """
+        grafo = self._grafo_en_memoria()
+        actuales = {}
+        for codigo in codigos_hacia:
+            tasa = self._tasa_en_memoria(grafo, codigo_desde, codigo)
+            if tasa is not None:
+                actuales[codigo] = tasa
+        return historico.generar_series(codigo_desde, actuales, dias, self.semilla_simulacion, fin)
+    
+    def _generar_datos_simulados(self, codigo_desde, codigo_hacia, dias, motivo):
+        """
+        Genera un histórico sintético reproducible que termina en la tasa
+        actual del par, usando solo las cotizaciones que ya están en memoria.
+        Retorna (datos, error); si el par no tiene tasa actual no se inventa
+        un ancla y se retorna sin datos.
+        """
+        tasa_actual = self._tasa_en_memoria(self._grafo_en_memoria(), codigo_desde, codigo_hacia)
+        if tasa_actual is None:
+            return [], f"{motivo}; Sin tasa actual de {codigo_desde} a {codigo_hacia} para anclar la simulación"
+        return (historico.generar_historico(codigo_desde, codigo_hacia, tasa_actual, dias,
+                                            self.semilla_simulacion),
+                motivo)
@@ -0,0 +1,341 @@
+"""
+Benchmark - Medición reproducible del pipeline léxico, sintáctico, conversión y gráfico
+Uso:
+    python benchmark.py --salida resultados.json
+    python benchmark.py --salida nuevo.json --comparar base.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import matplotlib
+import numpy as np
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from grammar import MAPEO_DIVISAS
+from registro_divisas import DIVISAS, PRINCIPALES
+from api_client import APITasasCambio
+from analizador_lexico import AnalizadorLexico
+from cache_resultados import CacheResultados, convertir_cadena
+from analizador_sintactico import AnalizadorSintactico, construir_parser
+from graficos import construir_grafico_comparativo, construir_grafico_historico
+from historico import generar_historico, generar_tabla
+from importacion_masiva import convertir_columnas
+from portafolio import CODIGOS as CODIGOS_PORTAFOLIO, Portafolio
+from gobernador import GobernadorSolicitudes
+
+
+class ServidorStub:
+    """Servidor HTTP local que imita las tres APIs de tasas con datos fijos"""
+
+    def __init__(self, semilla=0):
+        respaldo = APITasasCambio()
+        self.aleatorio = random.Random(semilla)
+        self.crypto_ids = respaldo.crypto_ids
+
+        # Tasas de respaldo donde existen y valores sintéticos fijos para el resto del registro
+        self.tasas = {d['code']: d.get('respaldo', round(self.aleatorio.uniform(0.5, 5000), 4))
+                      for d in DIVISAS if d['tipo'] == 'fiat'}
+        self.precios = {d['code']: d.get('respaldo', round(self.aleatorio.uniform(0.01, 1000), 6))
+                        for d in DIVISAS if d['tipo'] == 'crypto'}
+        self.servidor = None
+
+    def __enter__(self):
+        stub = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                cuerpo = json.dumps(stub.responder(url.path, params)).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    def responder(self, ruta, params):
+        """Arma la respuesta JSON de cada endpoint"""
+        if ruta.startswith('/v4/latest/'):
+            return {'base': 'USD', 'rates': self.tasas}
+
+        if ruta == '/api/v3/simple/price':
+            return {coin_id: {'usd': self.precios[code]} for code, coin_id in self.crypto_ids.items()}
+
+        if ruta == '/timeseries':
+            inicio = datetime.strptime(params['start_date'], '%Y-%m-%d')
+            fin = datetime.strptime(params['end_date'], '%Y-%m-%d')
+            simbolos = params['symbols'].split(',')
+            rates = {}
+            for i in range((fin - inicio).days + 1):
+                fecha = (inicio + timedelta(days=i)).strftime('%Y-%m-%d')
+                rates[fecha] = {s: self.tasas.get(s, 1.0) * (1 + self.aleatorio.uniform(-0.02, 0.02))
+                                for s in simbolos}
+            return {'success': True, 'rates': rates}
+
+        return {}
+
+    def configurar(self, api):
+        """Apunta un cliente APITasasCambio al servidor local, sin límites de tasa"""
+        api.gobernador = GobernadorSolicitudes()
+        for proveedor in ('exchangerate', 'exchangerate_host', 'coingecko'):
+            api.gobernador.configurar(proveedor, capacidad=10**9, por_segundo=10**9)
+        api.base_url = f"{self.url}/v4/latest/"
+        api.base_url_historico = self.url
+        api.base_url_crypto = f"{self.url}/api/v3"
+        return api
+
+
+def generar_corpus(cantidad, semilla=0):
+    """Genera sentencias válidas y reproducibles para la gramática"""
+    aleatorio = random.Random(semilla)
+    divisas = list(MAPEO_DIVISAS)
+    corpus = []
+    for _ in range(cantidad):
+        monto = round(aleatorio.uniform(0.01, 100000), aleatorio.choice([0, 2, 4]))
+        origen, destino = aleatorio.sample(divisas, 2)
+        corpus.append(f"convertir {monto} {origen} a {destino} $")
+    return corpus
+
+
+def percentil(ordenados, p):
+    """Percentil por interpolación lineal sobre una lista ordenada"""
+    if len(ordenados) == 1:
+        return ordenados[0]
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def medir_etapa(funcion, entradas):
+    """
+    Ejecuta funcion sobre cada entrada midiendo latencias con perf_counter_ns.
+    La memoria se mide en una segunda pasada con tracemalloc, para que su
+    costo no contamine las latencias.
+    """
+    latencias = []
+    inicio_total = time.perf_counter_ns()
+    for entrada in entradas:
+        inicio = time.perf_counter_ns()
+        funcion(entrada)
+        latencias.append(time.perf_counter_ns() - inicio)
+    total_ns = time.perf_counter_ns() - inicio_total
+
+    tracemalloc.start()
+    antes = tracemalloc.take_snapshot()
+    for entrada in entradas:
+        funcion(entrada)
+    despues = tracemalloc.take_snapshot()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    asignaciones = sum(max(d.count_diff, 0) for d in despues.compare_to(antes, 'lineno'))
+    ordenadas = sorted(latencias)
+    return {
+        'iteraciones': len(latencias),
+        'p50_us': percentil(ordenadas, 50) / 1000,
+        'p90_us': percentil(ordenadas, 90) / 1000,
+        'p99_us': percentil(ordenadas, 99) / 1000,
+        'media_us': statistics.fmean(latencias) / 1000,
+        'operaciones_por_segundo': len(latencias) / (total_ns / 1e9) if total_ns else 0,
+        'bloques_retenidos': asignaciones,
+        'memoria_pico_bytes': pico
+    }
+
+
+def _lexico_con_tabla(sentencia):
+    lexico = AnalizadorLexico(sentencia)
+    lexico.analizar()
+    return lexico.obtener_tabla_texto()
+
+
+def verificar_portafolio(api, divisas, cantidades, moneda, precios):
+    """
+    Aplica un tick a un portafolio ya valuado y compara la revaluación
+    incremental con la de un portafolio nuevo (recarga completa de tasas).
+    """
+    incremental = Portafolio(api, moneda)
+    incremental.cargar(divisas, cantidades)
+    incremental.valuar()
+    api.aplicar_precios_crypto(precios)
+
+    completo = Portafolio(api, moneda)
+    completo.cargar(divisas, cantidades)
+    esperado, obtenido = completo.valuar()['total'], incremental.valuar()['total']
+    incremental.cerrar()
+    completo.cerrar()
+    if not np.isclose(obtenido, esperado, rtol=1e-12):
+        raise AssertionError(f"Portafolio en {moneda}: incremental {obtenido} != recarga completa {esperado}")
+
+
+def ejecutar(iteraciones, semilla):
+    """Corre todas las etapas y retorna el reporte completo"""
+    corpus = generar_corpus(iteraciones, semilla)
+    etapas = {}
+
+    with ServidorStub(semilla) as servidor:
+        api = servidor.configurar(APITasasCambio())
+        api.obtener_tasas()
+
+        pocas = max(iteraciones // 20, 5)
+        etapas['red_obtener_tasas'] = medir_etapa(lambda _: api.obtener_tasas(), range(pocas))
+        etapas['red_obtener_historico'] = medir_etapa(
+            lambda _: api.obtener_historico('DolarEstadounidense', 'Euro', 30), range(pocas))
+
+        historico, _ = api.obtener_historico('DolarEstadounidense', 'Euro', 365)
+
+        comparadas = [clave for clave in PRINCIPALES if clave != 'DolarEstadounidense']
+        etapas['red_historico_multiple'] = medir_etapa(
+            lambda _: api.obtener_historico_multiple('DolarEstadounidense', comparadas, 365), range(pocas))
+        fechas, columnas, _ = api.obtener_historico_multiple('DolarEstadounidense', comparadas, 365)
+
+    etapas['historico_simulado_10_anios'] = medir_etapa(
+        lambda _: generar_historico('USD', 'EUR', 0.86, 3650, semilla), range(max(iteraciones // 100, 5)))
+
+    # Facturas con fecha: mil conversiones por lote resueltas en un historial de 10 años
+    api.historial.registrar_tabla(*generar_tabla(
+        {codigo: 1 / valor for codigo, valor in api.tasas_en_usd().items()}, 3650, semilla))
+    generador = random.Random(semilla)
+    lotes_con_fecha = [
+        (np.ones(1000),
+         np.array([generador.choice(CODIGOS_PORTAFOLIO) for _ in range(1000)]),
+         np.array([generador.choice(CODIGOS_PORTAFOLIO) for _ in range(1000)]),
+         np.datetime64('today', 'D') - np.array([generador.randrange(3650) for _ in range(1000)]))
+        for _ in range(max(iteraciones // 100, 5))
+    ]
+    etapas['importacion_con_fecha_1000'] = medir_etapa(
+        lambda lote: convertir_columnas(*lote[:3], api, fechas=lote[3]), lotes_con_fecha)
+
+    etapas['lexico'] = medir_etapa(lambda s: AnalizadorLexico(s).analizar(), corpus)
+    etapas['lexico_tabla'] = medir_etapa(_lexico_con_tabla, corpus)
+    etapas['construccion_lark'] = medir_etapa(lambda _: construir_parser(),
+                                              range(max(iteraciones // 100, 5)))
+    etapas['sintactico'] = medir_etapa(lambda s: AnalizadorSintactico(s).analizar(), corpus)
+
+    arboles = []
+    for s in corpus:
+        sintactico = AnalizadorSintactico(s)
+        sintactico.analizar()
+        arboles.append(sintactico.obtener_datos())
+    etapas['convertir'] = medir_etapa(
+        lambda d: api.convertir(d['cantidad'], d['origen'], d['destino']), arboles)
+
+    # Pipeline completo sin cache (cada sentencia es nueva) y con todas las consultas repetidas
+    cache = CacheResultados()
+    etapas['pipeline_completo'] = medir_etapa(lambda s: convertir_cadena(s, api, CacheResultados()), corpus)
+    for s in corpus:
+        convertir_cadena(s, api, cache)
+    etapas['pipeline_cache'] = medir_etapa(lambda s: convertir_cadena(s, api, cache), corpus)
+
+    # Revaluación de un libro de un millón de posiciones tras un tick de precio
+    generador = random.Random(semilla)
+    portafolio = Portafolio(api, 'Euro')
+    portafolio.cargar([generador.choice(CODIGOS_PORTAFOLIO) for _ in range(1_000_000)],
+                      [generador.uniform(1, 1000) for _ in range(1_000_000)])
+    portafolio.valuar()
+    etapas['portafolio_tick_1M'] = medir_etapa(
+        lambda precio: (api.aplicar_precios_crypto({'BTC': precio}), portafolio.valuar()),
+        [40000 + i for i in range(max(iteraciones // 10, 5))])
+    portafolio.cerrar()
+
+    # La revaluación incremental debe coincidir con la recarga completa, también
+    # cuando la moneda de reporte es la crypto que cambia
+    divisas = [generador.choice(CODIGOS_PORTAFOLIO) for _ in range(10_000)]
+    cantidades = [generador.uniform(1, 1000) for _ in range(10_000)]
+    for moneda in ('Euro', 'Bitcoin', 'Ethereum'):
+        verificar_portafolio(api, divisas, cantidades, moneda, {'BTC': 90000, 'ETH': 3000})
+        verificar_portafolio(api, divisas, cantidades, moneda, {'BTC': 91000})
+
+    etapas['grafico_365_dias'] = medir_etapa(
+        lambda _: FigureCanvasAgg(construir_grafico_historico(
+            historico, 'DolarEstadounidense', 'Euro', 365)).draw(),
+        range(max(iteraciones // 200, 3)))
+
+    # Todas las series en una figura que se reutiliza entre iteraciones
+    lienzo = FigureCanvasAgg(construir_grafico_comparativo(fechas, columnas, 'DolarEstadounidense', 365))
+
+    def redibujar(_):
+        construir_grafico_comparativo(fechas, columnas, 'DolarEstadounidense', 365, figura=lienzo.figure)
+        lienzo.draw()
+
+    etapas['grafico_comparativo_365_dias'] = medir_etapa(redibujar, range(max(iteraciones // 200, 3)))
+
+    return {
+        'commit': _commit_actual(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {'iteraciones': iteraciones, 'semilla': semilla},
+        'etapas': etapas
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(base, actual):
+    """Imprime la variación de p50 y throughput entre dos reportes"""
+    print(f"{'Etapa':<24}{'p50 base':>12}{'p50 actual':>12}{'cambio':>10}")
+    for etapa, medidas in actual['etapas'].items():
+        anterior = base['etapas'].get(etapa)
+        if not anterior:
+            continue
+        cambio = (medidas['p50_us'] / anterior['p50_us'] - 1) * 100 if anterior['p50_us'] else 0
+        print(f"{etapa:<24}{anterior['p50_us']:>12.1f}{medidas['p50_us']:>12.1f}{cambio:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del conversor de divisas")
+    parser.add_argument('--iteraciones', type=int, default=2000)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Archivo JSON donde guardar el reporte")
+    parser.add_argument('--comparar', help="Reporte JSON previo contra el cual comparar")
+    args = parser.parse_args()
+
+    reporte = ejecutar(args.iteraciones, args.semilla)
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            comparar(json.load(archivo), reporte)
+
+
+if __name__ == "__main__":
+    main()
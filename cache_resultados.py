@@ -0,0 +1,153 @@
+"""
+Cache de Resultados - Conversiones completas reutilizadas entre consultas idénticas
+"""
+
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+from analizador_lexico import AnalizadorLexico
+from analizador_sintactico import AnalizadorSintactico
+from instrumentacion import REGISTRO
+
+
+# Toda sentencia con "el AAAA-MM-DD" contiene una fecha con esta forma
+PATRON_FECHA = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+
+def normalizar(cadena):
+    """Clave de texto de una consulta: espacios colapsados, sin cambiar mayúsculas"""
+    return ' '.join(cadena.split())
+
+
+def tamano_aproximado(valor):
+    """Bytes ocupados por un resultado, recorriendo diccionarios, listas y tuplas"""
+    tamano = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        tamano += sum(tamano_aproximado(k) + tamano_aproximado(v) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple)):
+        tamano += sum(tamano_aproximado(v) for v in valor)
+    return tamano
+
+
+class CacheResultados:
+    """
+    Cache LRU acotada en bytes. Las claves incluyen el cliente API y la
+    versión de su snapshot de tasas, así que un cambio de cotizaciones deja
+    las entradas viejas sin uso y el orden LRU termina desalojándolas.
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024, max_bytes_entrada=64 * 1024):
+        self.max_bytes = max_bytes
+        self.max_bytes_entrada = max_bytes_entrada
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._entradas = OrderedDict()
+        self._bloqueo = threading.Lock()
+
+    def obtener(self, clave):
+        """Retorna el valor guardado o None, marcándolo como usado recientemente"""
+        with self._bloqueo:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+            else:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+
+        if entrada is None:
+            REGISTRO.incrementar('cache.fallos')
+            return None
+        REGISTRO.incrementar('cache.aciertos')
+        return entrada[0]
+
+    def guardar(self, clave, valor):
+        """Guarda valor desalojando los menos usados hasta respetar max_bytes"""
+        tamano = tamano_aproximado(clave) + tamano_aproximado(valor)
+        if tamano > self.max_bytes_entrada:
+            return
+
+        with self._bloqueo:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self.bytes -= anterior[1]
+
+            self._entradas[clave] = (valor, tamano)
+            self.bytes += tamano
+            while self.bytes > self.max_bytes:
+                _, (_, liberado) = self._entradas.popitem(last=False)
+                self.bytes -= liberado
+                self.desalojos += 1
+
+    def limpiar(self):
+        """Descarta todas las entradas y las estadísticas"""
+        with self._bloqueo:
+            self._entradas.clear()
+            self.bytes = self.aciertos = self.fallos = self.desalojos = 0
+
+    def estadisticas(self):
+        """Resumen de uso para el panel de diagnóstico"""
+        with self._bloqueo:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0
+            }
+
+
+CACHE_RESULTADOS = CacheResultados()
+
+
+def convertir_cadena(cadena, api, cache=CACHE_RESULTADOS):
+    """
+    Ejecuta el pipeline completo (léxico, sintáctico y conversión) sobre una
+    sentencia. Si la misma sentencia ya se resolvió con el mismo cliente y
+    el snapshot de tasas vigente, se retorna el resultado guardado sin
+    repetir ninguna etapa. Solo las sentencias que pueden llevar fecha
+    dependen además de la versión del historial.
+    Los errores de sintaxis también se guardan en el campo 'error'. El
+    resultado es compartido entre consultas y no debe modificarse.
+    """
+    texto = normalizar(cadena)
+    con_fecha = PATRON_FECHA.search(texto) is not None
+    version = _version(api, con_fecha)
+    clave = (texto, api.instancia, version)
+    resultado = cache.obtener(clave)
+    if resultado is not None:
+        return resultado
+
+    lexico = AnalizadorLexico(cadena)
+    tokens = lexico.analizar()
+    resultado = {'tokens': tokens, 'tabla_lexico': lexico.obtener_tabla_texto()}
+
+    sintactico = AnalizadorSintactico(cadena)
+    if sintactico.analizar():
+        datos = sintactico.obtener_datos()
+        if datos['fecha']:
+            conversion = api.convertir_en_fecha(datos['cantidad'], datos['origen'], datos['destino'], datos['fecha'])
+        else:
+            conversion = api.convertir(datos['cantidad'], datos['origen'], datos['destino'])
+        resultado.update(arbol_texto=sintactico.obtener_arbol_texto(), datos=datos, conversion=conversion)
+    else:
+        resultado.update(error=sintactico.error, errores=sintactico.errores)
+
+    # Si las tasas cambiaron durante la conversión el resultado no se guarda,
+    # así nunca queda asociado a una versión con la que no se calculó
+    if _version(api, con_fecha) == version:
+        cache.guardar(clave, resultado)
+    return resultado
+
+
+def _version(api, con_fecha):
+    """Versión de los datos de los que depende una sentencia, con o sin fecha"""
+    if con_fecha:
+        return api.version_tasas, api.historial.version
+    return api.version_tasas
@@ -0,0 +1,123 @@
+"""
+Feed de Precios - Actualización en vivo de criptomonedas por eventos
+"""
+
+import json
+import threading
+
+import requests
+
+from instrumentacion import REGISTRO
+
+
+class FuenteSSE:
+    """
+    Cliente Server-Sent Events. Cada evento trae en su campo data un JSON
+    con los precios que cambiaron, por ejemplo {"BTC": 45123.5, "ETH": 2480.1}.
+    """
+
+    # El flujo no tiene fin: si la conexión se cierra hay que reconectar
+    continua = True
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self._respuesta = None
+
+    def eventos(self):
+        """Genera los diccionarios de precios a medida que llegan"""
+        with requests.get(self.url, stream=True, timeout=self.timeout,
+                          headers={'Accept': 'text/event-stream'}) as respuesta:
+            respuesta.raise_for_status()
+            self._respuesta = respuesta
+
+            datos = []
+            for linea in respuesta.iter_lines(decode_unicode=True):
+                if linea is None:
+                    continue
+                if linea.startswith('data:'):
+                    datos.append(linea[5:].strip())
+                elif not linea and datos:
+                    # Una línea vacía cierra el evento
+                    yield json.loads('\n'.join(datos))
+                    datos = []
+
+    def cerrar(self):
+        if self._respuesta is not None:
+            self._respuesta.close()
+
+
+class FuenteMemoria:
+    """Fuente local que reproduce una lista de eventos, útil para pruebas sin red"""
+
+    continua = False
+
+    def __init__(self, eventos, intervalo=0):
+        self._eventos = list(eventos)
+        self.intervalo = intervalo
+        self._cerrada = threading.Event()
+
+    def eventos(self):
+        for evento in self._eventos:
+            if self._cerrada.is_set():
+                return
+            yield evento
+            if self.intervalo:
+                self._cerrada.wait(self.intervalo)
+
+    def cerrar(self):
+        self._cerrada.set()
+
+
+class FeedPrecios:
+    """Consume una fuente en un hilo y aplica cada evento al cliente de tasas"""
+
+    def __init__(self, api, fuente, reintento=5):
+        self.api = api
+        self.fuente = fuente
+        self.reintento = reintento
+        self.error = None
+        self._detenido = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Arranca el hilo consumidor"""
+        self._detenido.clear()
+        self._hilo = threading.Thread(target=self._consumir, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detiene el consumo y cierra la conexión"""
+        self._detenido.set()
+        self.fuente.cerrar()
+
+    def esperar(self, timeout=None):
+        """Espera a que el hilo termine (p. ej. al agotarse una FuenteMemoria)"""
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def _consumir(self):
+        while not self._detenido.is_set():
+            try:
+                for precios in self.fuente.eventos():
+                    if self._detenido.is_set():
+                        return
+                    try:
+                        self.api.aplicar_precios_crypto(precios)
+                    except (TypeError, AttributeError) as e:
+                        # Un evento mal formado se descarta sin cortar el feed
+                        self.api.avisos['crypto'] = f"Evento de precios inválido ignorado: {e}"
+                        REGISTRO.incrementar('feed.eventos_invalidos')
+                if not self.fuente.continua:
+                    # Una fuente finita terminó: no hay nada más que consumir
+                    return
+                motivo = "el servidor cerró la conexión"
+            except (requests.RequestException, ValueError) as e:
+                motivo = str(e)
+
+            if self._detenido.is_set():
+                return
+            self.error = motivo
+            self.api.avisos['crypto'] = f"Feed de precios interrumpido: {motivo}"
+            REGISTRO.incrementar('feed.reconexiones')
+            self._detenido.wait(self.reintento)
@@ -0,0 +1,196 @@
+"""
+Gobernador de Solicitudes - Límite de tasa, circuit breaker y coalescencia
+para todas las llamadas a las APIs externas
+"""
+
+import threading
+import time
+
+import requests
+
+from instrumentacion import REGISTRO
+
+
+class LimiteExcedidoError(requests.RequestException):
+    """El proveedor agotó su presupuesto de solicitudes"""
+
+
+class CircuitoAbiertoError(requests.RequestException):
+    """El proveedor falló repetidamente y se dejó de consultar temporalmente"""
+
+
+class CuboTokens:
+    """Token bucket: permite ráfagas de hasta capacidad y recarga por_segundo tokens"""
+
+    def __init__(self, capacidad, por_segundo):
+        self.capacidad = capacidad
+        self.por_segundo = por_segundo
+        self.tokens = float(capacidad)
+        self.ultima_recarga = time.monotonic()
+        self._bloqueo = threading.Lock()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultima_recarga) * self.por_segundo)
+        self.ultima_recarga = ahora
+
+    def tomar(self, espera_maxima=0):
+        """Consume un token esperando a lo sumo espera_maxima segundos"""
+        with self._bloqueo:
+            self._recargar()
+            faltante = 1 - self.tokens
+            espera = faltante / self.por_segundo if faltante > 0 else 0
+            if espera > espera_maxima:
+                return False
+            # Se reserva el token antes de dormir para que otros hilos esperen su turno
+            self.tokens -= 1
+
+        if espera:
+            time.sleep(espera)
+        return True
+
+
+class Circuito:
+    """Circuit breaker con estados cerrado, abierto y semiabierto"""
+
+    def __init__(self, umbral_fallos=3, enfriamiento=60):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.fallos = 0
+        self.abierto_desde = None
+        self._prueba_en_curso = False
+        self._bloqueo = threading.Lock()
+
+    @property
+    def estado(self):
+        if self.abierto_desde is None:
+            return 'cerrado'
+        if time.monotonic() - self.abierto_desde >= self.enfriamiento:
+            return 'semiabierto'
+        return 'abierto'
+
+    def permitir(self):
+        """Indica si se puede hacer una solicitud; en semiabierto solo deja pasar una"""
+        with self._bloqueo:
+            estado = self.estado
+            if estado == 'cerrado':
+                return True
+            if estado == 'semiabierto' and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            return False
+
+    def liberar_prueba(self):
+        """Permite otra prueba en semiabierto si la anterior no llegó a ejecutarse"""
+        with self._bloqueo:
+            self._prueba_en_curso = False
+
+    def registrar_exito(self):
+        with self._bloqueo:
+            self.fallos = 0
+            self.abierto_desde = None
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self):
+        with self._bloqueo:
+            self.fallos += 1
+            self._prueba_en_curso = False
+            if self.fallos >= self.umbral_fallos or self.abierto_desde is not None:
+                self.abierto_desde = time.monotonic()
+
+
+class _SolicitudEnVuelo:
+    """Resultado compartido entre hilos que piden exactamente lo mismo"""
+
+    def __init__(self):
+        self.terminada = threading.Event()
+        self.respuesta = None
+        self.error = None
+
+
+class GobernadorSolicitudes:
+    """Punto único por el que pasan todas las solicitudes HTTP a proveedores"""
+
+    def __init__(self):
+        self.cubos = {}
+        self.circuitos = {}
+        self._en_vuelo = {}
+        self._bloqueo = threading.Lock()
+
+    def configurar(self, proveedor, capacidad, por_segundo, umbral_fallos=3, enfriamiento=60):
+        """Define el presupuesto y la tolerancia a fallos de un proveedor"""
+        self.cubos[proveedor] = CuboTokens(capacidad, por_segundo)
+        self.circuitos[proveedor] = Circuito(umbral_fallos, enfriamiento)
+
+    def get(self, proveedor, url, params=None, timeout=10, espera_maxima=2):
+        """
+        Equivalente a requests.get para un proveedor configurado. Las solicitudes
+        idénticas concurrentes comparten una sola llamada real.
+        """
+        clave = (proveedor, url, tuple(sorted((params or {}).items())))
+
+        with self._bloqueo:
+            en_vuelo = self._en_vuelo.get(clave)
+            lider = en_vuelo is None
+            if lider:
+                en_vuelo = self._en_vuelo[clave] = _SolicitudEnVuelo()
+
+        if not lider:
+            REGISTRO.incrementar(f"gobernador.{proveedor}.coalescidas")
+            en_vuelo.terminada.wait()
+        else:
+            try:
+                en_vuelo.respuesta = self._ejecutar(proveedor, url, params, timeout, espera_maxima)
+            except requests.RequestException as e:
+                en_vuelo.error = e
+            finally:
+                with self._bloqueo:
+                    del self._en_vuelo[clave]
+                en_vuelo.terminada.set()
+
+        if en_vuelo.error is not None:
+            raise en_vuelo.error
+        return en_vuelo.respuesta
+
+    def _ejecutar(self, proveedor, url, params, timeout, espera_maxima):
+        circuito = self.circuitos[proveedor]
+        if not circuito.permitir():
+            REGISTRO.incrementar(f"gobernador.{proveedor}.circuito_abierto")
+            raise CircuitoAbiertoError(f"Proveedor {proveedor} suspendido tras fallos repetidos")
+
+        if not self.cubos[proveedor].tomar(espera_maxima):
+            REGISTRO.incrementar(f"gobernador.{proveedor}.limitadas")
+            # No cuenta como fallo del proveedor, así que se libera la prueba del circuito
+            circuito.liberar_prueba()
+            raise LimiteExcedidoError(f"Límite de solicitudes alcanzado para {proveedor}")
+
+        try:
+            respuesta = requests.get(url, params=params, timeout=timeout)
+        except requests.RequestException:
+            circuito.registrar_fallo()
+            raise
+
+        # 429 y 5xx indican que el proveedor está saturado o caído
+        if respuesta.status_code == 429 or respuesta.status_code >= 500:
+            circuito.registrar_fallo()
+        else:
+            circuito.registrar_exito()
+        return respuesta
+
+    def estado(self):
+        """Estado de cada proveedor para mostrar o exportar"""
+        return {
+            proveedor: {
+                'circuito': self.circuitos[proveedor].estado,
+                'fallos': self.circuitos[proveedor].fallos,
+                'tokens': round(self.cubos[proveedor].tokens, 2)
+            }
+            for proveedor in self.cubos
+        }
+
+
+# Instancia compartida por todos los clientes del proceso
+GOBERNADOR = GobernadorSolicitudes()
+GOBERNADOR.configurar('exchangerate', capacidad=5, por_segundo=0.5)
+GOBERNADOR.configurar('exchangerate_host', capacidad=5, por_segundo=0.5)
+GOBERNADOR.configurar('coingecko', capacidad=5, por_segundo=1 / 6)
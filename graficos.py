@@ -0,0 +1,96 @@
+"""
+Gráficos - Construcción de figuras de matplotlib independientes de la interfaz
+"""
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from grammar import MAPEO_DIVISAS
+from instrumentacion import instrumentado
+
+
+def preparar_figura(figura=None):
+    """Retorna figura vacía para volver a dibujar en ella, o una nueva si no hay"""
+    if figura is None:
+        return Figure(figsize=(12, 6), dpi=100)
+    figura.clear()
+    return figura
+
+
+@instrumentado('grafico.construir')
+def construir_grafico_historico(datos, origen, destino, dias, figura=None):
+    """Crea (o redibuja en figura) el histórico de tasas de un par de divisas"""
+    fechas = [d['fecha'] for d in datos]
+    tasas = [d['tasa'] for d in datos]
+
+    figura = preparar_figura(figura)
+    ax = figura.add_subplot(111)
+
+    ax.plot(fechas, tasas, marker='o', markersize=4, linewidth=2.5,
+           color='#3498db', label=f'{origen} → {destino}')
+
+    origen_info = MAPEO_DIVISAS[origen]
+    destino_info = MAPEO_DIVISAS[destino]
+
+    ax.set_title(f'Histórico de Tasa de Cambio: {origen_info["nombre"]} → {destino_info["nombre"]}\n'
+                f'Periodo: {dias} días', fontsize=14, fontweight='bold', pad=20)
+    ax.set_xlabel('Fecha', fontsize=12, fontweight='bold')
+    ax.set_ylabel(f'Tasa ({origen_info["symbol"]} → {destino_info["symbol"]})',
+                 fontsize=12, fontweight='bold')
+    ax.grid(True, alpha=0.3, linestyle='--')
+    ax.legend(fontsize=11, loc='best')
+
+    # Rotar etiquetas de fecha
+    figura.autofmt_xdate()
+    figura.tight_layout()
+    return figura
+
+
+def calcular_series(columnas, normalizado=False, invertir=False):
+    """
+    Apila las series en una matriz (una columna por divisa) y aplica en una
+    sola pasada la inversión (valor de cada divisa en la base) y la
+    normalización a 100 en el primer dato disponible.
+    """
+    matriz = np.column_stack(list(columnas.values())).astype(np.float64)
+    if invertir:
+        with np.errstate(divide='ignore'):
+            matriz = 1 / matriz
+    if normalizado:
+        primeros = matriz[np.argmax(~np.isnan(matriz), axis=0), np.arange(matriz.shape[1])]
+        matriz = matriz / primeros * 100
+    return matriz
+
+
+@instrumentado('grafico.construir_comparativo')
+def construir_grafico_comparativo(fechas, columnas, base, dias, normalizado=True, invertir=False,
+                                  figura=None):
+    """
+    Dibuja varias series contra una misma divisa base en una sola figura.
+    columnas es {clave: arreglo de tasas base -> clave}; con invertir=True se
+    grafica el valor de cada divisa expresado en la base.
+    """
+    matriz = calcular_series(columnas, normalizado, invertir)
+
+    figura = preparar_figura(figura)
+    ax = figura.add_subplot(111)
+
+    # Una sola llamada dibuja todas las columnas de la matriz
+    lineas = ax.plot(fechas.astype('datetime64[s]').tolist(), matriz, linewidth=1.8)
+    ax.legend(lineas, [MAPEO_DIVISAS[clave]['code'] for clave in columnas],
+              fontsize=9, loc='upper left', ncol=max(1, len(lineas) // 10))
+
+    base_info = MAPEO_DIVISAS[base]
+    if invertir:
+        titulo = f'Valor en {base_info["nombre"]}'
+    else:
+        titulo = f'{base_info["nombre"]} frente a {len(columnas)} divisas'
+    ax.set_title(f'{titulo}\nPeriodo: {dias} días', fontsize=14, fontweight='bold', pad=20)
+    ax.set_xlabel('Fecha', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Índice (inicio = 100)' if normalizado else f'Tasa ({base_info["symbol"]})',
+                  fontsize=12, fontweight='bold')
+    ax.grid(True, alpha=0.3, linestyle='--')
+
+    figura.autofmt_xdate()
+    figura.tight_layout()
+    return figura
@@ -0,0 +1,154 @@
+"""
+Grafo de Divisas - Resolución de tasas cruzadas por rutas de cotizaciones
+"""
+
+from collections import deque
+
+
+class SinCotizacionError(ValueError):
+    """No existe ninguna ruta de cotizaciones entre dos divisas"""
+
+
+class GrafoDivisas:
+    """
+    Grafo no dirigido de cotizaciones. Cada arista guarda la tasa en ambos
+    sentidos y, para cada divisa de origen, se precalcula la ruta con menos
+    saltos hacia todas las demás junto con la tasa compuesta, de modo que
+    una consulta es solo una búsqueda en diccionario.
+    """
+
+    def __init__(self):
+        self.aristas = {}
+        self._filas = {}
+
+    @classmethod
+    def desde_snapshot(cls, tasas_fiat, precios_crypto, pares_directos=None, numero=float):
+        """
+        Construye el grafo a partir de las cotizaciones disponibles:
+        tasas_fiat en unidades por USD, precios_crypto en USD por unidad y
+        pares_directos como {(desde, hacia): tasa}. numero permite usar
+        Fraction para obtener tasas exactas.
+        """
+        grafo = cls()
+        for codigo, tasa in (tasas_fiat or {}).items():
+            if codigo != 'USD':
+                grafo.agregar_cotizacion('USD', codigo, numero(tasa))
+        for codigo, precio in (precios_crypto or {}).items():
+            grafo.agregar_cotizacion(codigo, 'USD', numero(precio))
+        for (desde, hacia), tasa in (pares_directos or {}).items():
+            grafo.agregar_cotizacion(desde, hacia, numero(tasa))
+        return grafo
+
+    def agregar_cotizacion(self, desde, hacia, tasa):
+        """Registra que 1 desde = tasa hacia (las cotizaciones inválidas se ignoran)"""
+        if tasa is None or not tasa > 0:
+            return
+        self.aristas.setdefault(desde, {})[hacia] = tasa
+        self.aristas.setdefault(hacia, {})[desde] = 1 / tasa
+        self._filas.clear()
+
+    def actualizar_cotizacion(self, desde, hacia, tasa):
+        """
+        Cambia la tasa de una arista existente recalculando solo las entradas
+        de las rutas que pasan por ella. Si la arista es nueva, las rutas pueden
+        cambiar y se descartan todas.
+        """
+        if tasa is None or not tasa > 0:
+            return
+        if hacia not in self.aristas.get(desde, {}):
+            self.agregar_cotizacion(desde, hacia, tasa)
+            return
+
+        self.aristas[desde][hacia] = tasa
+        self.aristas[hacia][desde] = 1 / tasa
+
+        for fila in self._filas.values():
+            if hacia in fila and fila[hacia][0] == desde:
+                self._recalcular_subarbol(fila, hacia)
+            elif desde in fila and fila[desde][0] == hacia:
+                self._recalcular_subarbol(fila, desde)
+
+    def _recalcular_subarbol(self, fila, raiz):
+        """Recalcula las tasas de raiz y de todos los nodos que cuelgan de ella"""
+        padre = fila[raiz][0]
+        fila[raiz] = self._entrada_desde(fila, raiz, padre)
+
+        # Una hoja (p. ej. una crypto cotizada solo contra USD) no tiene descendientes
+        if len(self.aristas[raiz]) == 1:
+            return
+
+        # El orden de inserción de la fila es el del recorrido en anchura,
+        # así que cada padre se recalcula antes que sus hijos
+        afectados = {raiz}
+        for nodo, (padre, _, _) in fila.items():
+            if padre in afectados:
+                fila[nodo] = self._entrada_desde(fila, nodo, padre)
+                afectados.add(nodo)
+
+    def _entrada_desde(self, fila, nodo, padre):
+        _, ida, vuelta = fila[padre]
+        return padre, ida * self.aristas[padre][nodo], self.aristas[nodo][padre] * vuelta
+
+    def precalcular(self):
+        """Calcula las rutas de todas las divisas hacia todas las demás"""
+        for codigo in self.aristas:
+            self._fila(codigo)
+
+    def _fila(self, origen):
+        """Recorrido en anchura desde origen; se calcula una sola vez por snapshot"""
+        fila = self._filas.get(origen)
+        if fila is not None:
+            return fila
+
+        # nodo -> (padre, tasa origen->nodo, tasa nodo->origen)
+        fila = {origen: (None, 1, 1)}
+        pendientes = deque([origen])
+        while pendientes:
+            nodo = pendientes.popleft()
+            _, ida, vuelta = fila[nodo]
+            for vecino, tasa in self.aristas.get(nodo, {}).items():
+                if vecino not in fila:
+                    fila[vecino] = (nodo, ida * tasa, self.aristas[vecino][nodo] * vuelta)
+                    pendientes.append(vecino)
+
+        self._filas[origen] = fila
+        return fila
+
+    def _entrada(self, desde, hacia):
+        entrada = self._fila(desde).get(hacia)
+        if entrada is None:
+            raise SinCotizacionError(f"No hay cotizaciones que conecten {desde} con {hacia}")
+        return entrada
+
+    def tasa(self, desde, hacia):
+        """Unidades de hacia que equivalen a 1 unidad de desde"""
+        return self._entrada(desde, hacia)[1]
+
+    def valores_en(self, referencia):
+        """Valor de 1 unidad de cada divisa alcanzable, expresado en referencia"""
+        return {codigo: vuelta for codigo, (_, _, vuelta) in self._fila(referencia).items()}
+
+    def valores_de(self, codigos, referencia):
+        """Como valores_en, pero solo para codigos (los no alcanzables se omiten)"""
+        fila = self._fila(referencia)
+        return {codigo: fila[codigo][2] for codigo in codigos if codigo in fila}
+
+    def dependientes(self, codigos, referencia):
+        """Divisas cuya ruta hacia referencia pasa por alguno de codigos (incluidos ellos mismos)"""
+        fila = self._fila(referencia)
+        afectados = set(codigos) & fila.keys()
+
+        # La fila está en orden de recorrido en anchura: cada padre aparece antes que sus hijos
+        for nodo, (padre, _, _) in fila.items():
+            if padre in afectados:
+                afectados.add(nodo)
+        return afectados
+
+    def ruta(self, desde, hacia):
+        """Lista de divisas por las que pasa la conversión"""
+        fila = self._fila(desde)
+        self._entrada(desde, hacia)
+        ruta = [hacia]
+        while ruta[-1] != desde:
+            ruta.append(fila[ruta[-1]][0])
+        return ruta[::-1]
@@ -3,19 +3,28 @@ Interfaz Gráfica del Conversor de Divisas
 """
 
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, scrolledtext, messagebox, filedialog
+import os
 import threading
 import matplotlib
 matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
 from datetime import datetime
 
 from grammar import MAPEO_DIVISAS
+from registro_divisas import PRINCIPALES
 from api_client import APITasasCambio
-from analizador_lexico import AnalizadorLexico
-from analizador_sintactico import AnalizadorSintactico
+from cache_resultados import CACHE_RESULTADOS, convertir_cadena
+from graficos import calcular_series, construir_grafico_comparativo, construir_grafico_historico
+from instrumentacion import REGISTRO, instrumentado
+from feed_precios import FeedPrecios, FuenteSSE
+from historico import ProveedorReplay
+
+
+# Modos del gráfico histórico: un par, el origen contra las divisas
+# principales o el valor de las criptomonedas principales en el origen
+MODOS_GRAFICO = ["Par seleccionado", "Origen vs. principales", "Criptomonedas en origen"]
 
 
 class ConversorGUI:
@@ -30,6 +39,8 @@ class ConversorGUI:
         self.api = APITasasCambio()
         self.figura_grafico = None
         self.canvas_grafico = None
+        self.feed_precios = None
+        self._ultima_conversion = None
         
         # Configurar estilo
         self.style = ttk.Style()
@@ -37,6 +48,20 @@ class ConversorGUI:
         
         self.crear_interfaz()
         self.cargar_tasas_iniciales()
+        
+        # Históricos grabados en disco en lugar de la API
+        ruta_historico = os.environ.get('CONVERSOR_HISTORICO_REPLAY')
+        if ruta_historico:
+            self.api.proveedor_historico = ProveedorReplay(ruta_historico)
+            
+            # La misma tabla sirve para las conversiones "el AAAA-MM-DD"
+            self.api.historial.registrar_tabla(self.api.proveedor_historico.fechas,
+                                               self.api.proveedor_historico.columnas)
+        
+        # Precios crypto en vivo si se configuró un feed
+        url_feed = os.environ.get('CONVERSOR_FEED_CRYPTO')
+        if url_feed:
+            self.iniciar_feed_precios(url_feed)
     
     def crear_interfaz(self):
         """Crea todos los elementos de la interfaz"""
@@ -202,6 +227,12 @@ class ConversorGUI:
                                 variable=self.periodo_var, value=valor)
             rb.pack(side=tk.LEFT, padx=5)
         
+        tk.Label(control_grafico_frame, text="Comparar:", font=("Arial", 10, "bold")).pack(side=tk.LEFT, padx=(15, 5))
+        self.modo_grafico = ttk.Combobox(control_grafico_frame, state="readonly", width=24,
+                                         values=MODOS_GRAFICO)
+        self.modo_grafico.current(0)
+        self.modo_grafico.pack(side=tk.LEFT, padx=5)
+        
         self.btn_graficar = tk.Button(control_grafico_frame, text="Generar Gráfico", 
                                       command=self.generar_grafico, bg="#9b59b6", fg="white",
                                       font=("Arial", 10, "bold"), padx=15, pady=8)
@@ -217,6 +248,34 @@ class ConversorGUI:
                                         font=("Arial", 12), fg="#7f8c8d", pady=30)
         self.mensaje_grafico.pack()
         
+        # Pestaña Diagnóstico
+        diagnostico_frame = ttk.Frame(self.notebook)
+        self.notebook.add(diagnostico_frame, text="Diagnóstico")
+        
+        control_diagnostico_frame = ttk.Frame(diagnostico_frame)
+        control_diagnostico_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        self.instrumentacion_var = tk.BooleanVar(value=REGISTRO.activo)
+        ttk.Checkbutton(control_diagnostico_frame, text="Medir etapas", 
+                        variable=self.instrumentacion_var,
+                        command=self._alternar_instrumentacion).pack(side=tk.LEFT, padx=5)
+        
+        self.spans_var = tk.BooleanVar(value=REGISTRO.spans_activos)
+        ttk.Checkbutton(control_diagnostico_frame, text="Registrar trazas", 
+                        variable=self.spans_var,
+                        command=self._alternar_instrumentacion).pack(side=tk.LEFT, padx=5)
+        
+        for texto, comando in [("Refrescar", self.refrescar_diagnostico),
+                               ("Reiniciar", self._reiniciar_diagnostico),
+                               ("Exportar JSON", lambda: self.exportar_metricas('json')),
+                               ("Exportar Prometheus", lambda: self.exportar_metricas('prometheus'))]:
+            tk.Button(control_diagnostico_frame, text=texto, command=comando, bg="#34495e", fg="white",
+                      font=("Arial", 9), padx=10, pady=4).pack(side=tk.LEFT, padx=5)
+        
+        self.diagnostico_text = scrolledtext.ScrolledText(diagnostico_frame, wrap=tk.NONE, 
+                                                          font=("Courier", 9), height=15)
+        self.diagnostico_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
         # Configurar peso de filas y columnas para redimensionamiento
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
@@ -269,9 +328,12 @@ class ConversorGUI:
             
             tasas, error = self.api.obtener_tasas()
             
+            avisos = self.api.avisos_respaldo()
             if error:
                 mensaje = f"{error} (usando tasas de respaldo)"
                 self.estado_label.config(text=mensaje, fg="#e67e22")
+            elif avisos:
+                self.estado_label.config(text=" | ".join(avisos), fg="#e67e22")
             else:
                 fecha = self.api.ultima_actualizacion.strftime('%Y-%m-%d %H:%M:%S')
                 self.estado_label.config(text=f"Tasas actualizadas: {fecha}", fg="#27ae60")
@@ -285,6 +347,7 @@ class ConversorGUI:
         """Actualiza las tasas de cambio"""
         self.cargar_tasas_iniciales()
     
+    @instrumentado('gui.convertir')
     def convertir(self):
         """Ejecuta el proceso completo de conversión"""
         try:
@@ -304,72 +367,91 @@ class ConversorGUI:
                 messagebox.showerror("Error", f"Cantidad inválida: {e}")
                 return
             
-            # PASO 1: Análisis Léxico
-            lexico = AnalizadorLexico(cadena)
-            tokens = lexico.analizar()
-            tabla_lexico = lexico.obtener_tabla_texto()
+            # Léxico, sintáctico y conversión (o el resultado guardado de una consulta idéntica)
+            resultado = convertir_cadena(cadena, self.api)
             
-            self.lexico_text.delete(1.0, tk.END)
-            self.lexico_text.insert(tk.END, "="*80 + "\n")
-            self.lexico_text.insert(tk.END, "ANÁLISIS LÉXICO\n")
-            self.lexico_text.insert(tk.END, "="*80 + "\n\n")
-            self.lexico_text.insert(tk.END, tabla_lexico)
+            # PASO 1: Análisis Léxico
+            with REGISTRO.medir('gui.insertar_texto'):
+                self.lexico_text.delete(1.0, tk.END)
+                self.lexico_text.insert(tk.END, "="*80 + "\n")
+                self.lexico_text.insert(tk.END, "ANÁLISIS LÉXICO\n")
+                self.lexico_text.insert(tk.END, "="*80 + "\n\n")
+                self.lexico_text.insert(tk.END, resultado['tabla_lexico'])
             
             # PASO 2: Análisis Sintáctico
-            sintactico = AnalizadorSintactico(cadena)
-            
-            if not sintactico.analizar():
+            if 'error' in resultado:
                 messagebox.showerror("Error Sintáctico", 
-                                   f"La entrada no cumple con la gramática:\n{sintactico.error}")
+                                   f"La entrada no cumple con la gramática:\n{resultado['error']}")
                 return
             
-            arbol_texto = sintactico.obtener_arbol_texto()
-            
-            self.sintactico_text.delete(1.0, tk.END)
-            self.sintactico_text.insert(tk.END, "="*80 + "\n")
-            self.sintactico_text.insert(tk.END, "ÁRBOL SINTÁCTICO ABSTRACTO (AST)\n")
-            self.sintactico_text.insert(tk.END, "="*80 + "\n\n")
-            self.sintactico_text.insert(tk.END, arbol_texto)
+            with REGISTRO.medir('gui.insertar_texto'):
+                self.sintactico_text.delete(1.0, tk.END)
+                self.sintactico_text.insert(tk.END, "="*80 + "\n")
+                self.sintactico_text.insert(tk.END, "ÁRBOL SINTÁCTICO ABSTRACTO (AST)\n")
+                self.sintactico_text.insert(tk.END, "="*80 + "\n\n")
+                self.sintactico_text.insert(tk.END, resultado['arbol_texto'])
             
             # PASO 3: Conversión
-            datos = sintactico.obtener_datos()
-            resultado_api = self.api.convertir(datos['cantidad'], datos['origen'], datos['destino'])
-            
-            # Mostrar resultado
-            origen_info = MAPEO_DIVISAS[datos['origen']]
-            destino_info = MAPEO_DIVISAS[datos['destino']]
-            
-            # Formatear resultado según el tipo de moneda
-            if destino_info['tipo'] == 'crypto':
-                # Para crypto, mostrar más decimales
-                resultado_texto = f"{resultado_api['resultado']:.8f} {destino_info['symbol']}"
-            else:
-                # Para fiat, 2 decimales
-                resultado_texto = f"{resultado_api['resultado']:.2f} {destino_info['symbol']}"
-            
-            self.resultado_text.config(text=resultado_texto, fg="#27ae60")
-            
-            # Formatear tasa según los tipos
-            if origen_info['tipo'] == 'crypto' or destino_info['tipo'] == 'crypto':
-                tasa_texto = f"Tasa: 1 {origen_info['symbol']} = {resultado_api['tasa']:.8f} {destino_info['symbol']}"
-            else:
-                tasa_texto = f"Tasa: 1 {origen_info['symbol']} = {resultado_api['tasa']:.4f} {destino_info['symbol']}"
-            
-            self.tasa_label.config(text=tasa_texto)
-            
-            # Mostrar también la tasa inversa
-            tasa_inversa = 1 / resultado_api['tasa'] if resultado_api['tasa'] > 0 else 0
-            
-            if origen_info['tipo'] == 'crypto' or destino_info['tipo'] == 'crypto':
-                tasa_inversa_texto = f"Inversa: 1 {destino_info['symbol']} = {tasa_inversa:.8f} {origen_info['symbol']}"
-            else:
-                tasa_inversa_texto = f"Inversa: 1 {destino_info['symbol']} = {tasa_inversa:.4f} {origen_info['symbol']}"
-            
-            self.tasa_inversa_label.config(text=tasa_inversa_texto)
+            self._ultima_conversion = resultado['datos']
+            self._mostrar_resultado(resultado['datos'], resultado['conversion'])
             
         except Exception as e:
             messagebox.showerror("Error", f"Error durante la conversión:\n{str(e)}")
     
+    def _mostrar_resultado(self, datos, resultado_api):
+        """Muestra el resultado y las tasas de una conversión"""
+        origen_info = MAPEO_DIVISAS[datos['origen']]
+        destino_info = MAPEO_DIVISAS[datos['destino']]
+        
+        # Formatear resultado según el tipo de moneda
+        if destino_info['tipo'] == 'crypto':
+            # Para crypto, mostrar más decimales
+            resultado_texto = f"{resultado_api['resultado']:.8f} {destino_info['symbol']}"
+        else:
+            # Para fiat, 2 decimales
+            resultado_texto = f"{resultado_api['resultado']:.2f} {destino_info['symbol']}"
+        
+        self.resultado_text.config(text=resultado_texto, fg="#27ae60")
+        
+        # Formatear tasa según los tipos
+        if origen_info['tipo'] == 'crypto' or destino_info['tipo'] == 'crypto':
+            tasa_texto = f"Tasa: 1 {origen_info['symbol']} = {resultado_api['tasa']:.8f} {destino_info['symbol']}"
+        else:
+            tasa_texto = f"Tasa: 1 {origen_info['symbol']} = {resultado_api['tasa']:.4f} {destino_info['symbol']}"
+        
+        self.tasa_label.config(text=tasa_texto)
+        
+        # Mostrar también la tasa inversa
+        tasa_inversa = 1 / resultado_api['tasa'] if resultado_api['tasa'] > 0 else 0
+        
+        if origen_info['tipo'] == 'crypto' or destino_info['tipo'] == 'crypto':
+            tasa_inversa_texto = f"Inversa: 1 {destino_info['symbol']} = {tasa_inversa:.8f} {origen_info['symbol']}"
+        else:
+            tasa_inversa_texto = f"Inversa: 1 {destino_info['symbol']} = {tasa_inversa:.4f} {origen_info['symbol']}"
+        
+        self.tasa_inversa_label.config(text=tasa_inversa_texto)
+    
+    def _precios_actualizados(self, codigos):
+        """Recalcula el resultado mostrado si depende de los precios que cambiaron"""
+        datos = self._ultima_conversion
+        if not datos or datos['fecha']:
+            # Una conversión a una fecha pasada no depende de los precios en vivo
+            return
+        
+        codigos_conversion = {MAPEO_DIVISAS[datos['origen']]['code'], MAPEO_DIVISAS[datos['destino']]['code']}
+        if codigos_conversion & set(codigos):
+            try:
+                resultado_api = self.api.convertir(datos['cantidad'], datos['origen'], datos['destino'])
+                self._mostrar_resultado(datos, resultado_api)
+            except Exception as e:
+                self.estado_label.config(text=f"No se pudo actualizar el resultado: {e}", fg="#e67e22")
+    
+    def iniciar_feed_precios(self, url):
+        """Suscribe la interfaz a un feed SSE de precios crypto"""
+        self.api.suscribir(lambda codigos: self.root.after(0, self._precios_actualizados, codigos))
+        self.feed_precios = FeedPrecios(self.api, FuenteSSE(url))
+        self.feed_precios.iniciar()
+    
     def limpiar(self):
         """Limpia todos los campos"""
         self.cantidad_entry.delete(0, tk.END)
@@ -379,6 +461,7 @@ class ConversorGUI:
         self.resultado_text.config(text="Ingrese los datos\ny presione Convertir", fg="#2c3e50")
         self.tasa_label.config(text="")
         self.tasa_inversa_label.config(text="")
+        self._ultima_conversion = None
         self.lexico_text.delete(1.0, tk.END)
         self.sintactico_text.delete(1.0, tk.END)
         self.actualizar_cadena()
@@ -415,13 +498,26 @@ class ConversorGUI:
             if hasattr(self, 'mensaje_grafico') and self.mensaje_grafico.winfo_exists():
                 self.mensaje_grafico.config(text="Obteniendo datos históricos...")
             
+            modo = self.modo_grafico.current()
+            if modo == 1:
+                comparadas = [clave for clave in PRINCIPALES if clave != origen]
+            elif modo == 2:
+                comparadas = [clave for clave in PRINCIPALES
+                              if clave != origen and MAPEO_DIVISAS[clave]['tipo'] == 'crypto']
+            
             # Cargar datos en hilo separado
             def cargar_y_graficar():
-                # Obtener datos históricos
-                datos, error = self.api.obtener_historico(origen, destino, dias)
-                
-                # Actualizar UI en el hilo principal
-                self.root.after(0, lambda: self._mostrar_grafico(datos, error, origen, destino, dias))
+                if modo == 0:
+                    # Obtener datos históricos
+                    datos, error = self.api.obtener_historico(origen, destino, dias)
+                    
+                    # Actualizar UI en el hilo principal
+                    self.root.after(0, lambda: self._mostrar_grafico(datos, error, origen, destino, dias))
+                else:
+                    # Todas las series llegan en una sola solicitud
+                    fechas, columnas, error = self.api.obtener_historico_multiple(origen, comparadas, dias)
+                    self.root.after(0, lambda: self._mostrar_grafico_comparativo(
+                        fechas, columnas, error, origen, dias, invertir=modo == 2))
             
             thread = threading.Thread(target=cargar_y_graficar, daemon=True)
             thread.start()
@@ -430,79 +526,46 @@ class ConversorGUI:
             messagebox.showerror("Error", f"Error al generar gráfico:\n{str(e)}")
             self.btn_graficar.config(state=tk.NORMAL, text="Generar Gráfico")
     
-    def _mostrar_grafico(self, datos, error, origen, destino, dias):
-        """Muestra el gráfico con los datos históricos"""
-        try:
-            # Cerrar figura anterior si existe
-            if self.figura_grafico is not None:
-                plt.close(self.figura_grafico)
-                self.figura_grafico = None
-            
-            # Destruir canvas anterior si existe
-            if self.canvas_grafico is not None:
-                try:
-                    widget = self.canvas_grafico.get_tk_widget()
-                    if widget.winfo_exists():
-                        widget.destroy()
-                except:
-                    pass
-                self.canvas_grafico = None
-            
-            # Limpiar todos los widgets del contenedor
-            for widget in list(self.grafico_container.winfo_children()):
+    def _preparar_contenedor_grafico(self):
+        """Quita mensajes y estadísticas anteriores conservando el canvas para reutilizarlo"""
+        canvas_widget = self.canvas_grafico.get_tk_widget() if self.canvas_grafico is not None else None
+        for widget in list(self.grafico_container.winfo_children()):
+            if widget is not canvas_widget:
                 try:
                     widget.destroy()
                 except:
                     pass
+    
+    def _dibujar_figura(self):
+        """Dibuja self.figura_grafico creando el canvas solo la primera vez"""
+        if self.canvas_grafico is None:
+            self.canvas_grafico = FigureCanvasTkAgg(self.figura_grafico, master=self.grafico_container)
+            self.canvas_grafico.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        with REGISTRO.medir('grafico.dibujar'):
+            self.canvas_grafico.draw()
+        
+        # Forzar actualización
+        self.grafico_container.update()
+    
+    def _mostrar_grafico(self, datos, error, origen, destino, dias):
+        """Muestra el gráfico con los datos históricos"""
+        try:
+            self._preparar_contenedor_grafico()
             
             if not datos:
                 mensaje_error = tk.Label(self.grafico_container, 
-                                        text="No se pudieron obtener datos históricos",
+                                        text=error or "No se pudieron obtener datos históricos",
                                         font=("Arial", 11), fg="#e74c3c")
                 mensaje_error.pack(pady=30)
                 self.btn_graficar.config(state=tk.NORMAL, text="📈 Generar Gráfico")
                 return
             
-            # Extraer datos para graficar
-            fechas = [d['fecha'] for d in datos]
             tasas = [d['tasa'] for d in datos]
             
-            # Crear figura de matplotlib más grande
-            self.figura_grafico = Figure(figsize=(12, 6), dpi=100)
-            ax = self.figura_grafico.add_subplot(111)
-            
-            # Graficar
-            ax.plot(fechas, tasas, marker='o', markersize=4, linewidth=2.5, 
-                   color='#3498db', label=f'{origen} → {destino}')
-            
-            # Configurar gráfico
-            origen_info = MAPEO_DIVISAS[origen]
-            destino_info = MAPEO_DIVISAS[destino]
-            
-            ax.set_title(f'Histórico de Tasa de Cambio: {origen_info["nombre"]} → {destino_info["nombre"]}\n'
-                        f'Periodo: {dias} días', fontsize=14, fontweight='bold', pad=20)
-            ax.set_xlabel('Fecha', fontsize=12, fontweight='bold')
-            ax.set_ylabel(f'Tasa ({origen_info["symbol"]} → {destino_info["symbol"]})', 
-                         fontsize=12, fontweight='bold')
-            ax.grid(True, alpha=0.3, linestyle='--')
-            ax.legend(fontsize=11, loc='best')
-            
-            # Rotar etiquetas de fecha
-            self.figura_grafico.autofmt_xdate()
-            
-            # Ajustar layout
-            self.figura_grafico.tight_layout()
-            
-            # Crear nuevo canvas
-            self.canvas_grafico = FigureCanvasTkAgg(self.figura_grafico, master=self.grafico_container)
-            self.canvas_grafico.draw()
-            
-            # Empaquetar el widget
-            canvas_widget = self.canvas_grafico.get_tk_widget()
-            canvas_widget.pack(fill=tk.BOTH, expand=True)
-            
-            # Forzar actualización
-            self.grafico_container.update()
+            # Redibujar en la figura existente (o crearla la primera vez)
+            self.figura_grafico = construir_grafico_historico(datos, origen, destino, dias,
+                                                              self.figura_grafico)
+            self._dibujar_figura()
             
             # Mostrar mensaje si hay error
             if error:
@@ -539,6 +602,48 @@ class ConversorGUI:
                     widget.destroy()
                 except:
                     pass
+            self.canvas_grafico = None
+        
+        finally:
+            self.btn_graficar.config(state=tk.NORMAL, text="Generar Gráfico")
+    
+    def _mostrar_grafico_comparativo(self, fechas, columnas, error, origen, dias, invertir):
+        """Muestra varias series contra el origen en la misma figura"""
+        try:
+            self._preparar_contenedor_grafico()
+            
+            if not columnas:
+                mensaje_error = tk.Label(self.grafico_container, 
+                                        text=error or "No hay divisas para comparar con el origen seleccionado",
+                                        font=("Arial", 11), fg="#e74c3c")
+                mensaje_error.pack(pady=30)
+                return
+            
+            self.figura_grafico = construir_grafico_comparativo(fechas, columnas, origen, dias,
+                                                                invertir=invertir,
+                                                                figura=self.figura_grafico)
+            self._dibujar_figura()
+            
+            if error:
+                mensaje_error = tk.Label(self.grafico_container, text=f"{error}",
+                                        font=("Arial", 9), fg="#e67e22")
+                mensaje_error.pack(pady=5)
+            
+            # Variación de cada serie en el periodo, calculada sobre la matriz completa
+            series = calcular_series(columnas, normalizado=True, invertir=invertir)
+            variaciones = series[-1] - 100
+            stats_text = " | ".join(f"{MAPEO_DIVISAS[clave]['code']}: {variacion:+.2f}%"
+                                    for clave, variacion in zip(columnas, variaciones))
+            
+            stats_label = tk.Label(self.grafico_container, text=f"Variación del periodo: {stats_text}",
+                                  font=("Arial", 10, "bold"), fg="#2c3e50", bg="#ecf0f1", 
+                                  pady=10, padx=10, relief=tk.RIDGE, wraplength=1000)
+            stats_label.pack(pady=10, fill=tk.X, padx=20)
+            
+            self.notebook.select(self.grafico_tab)
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al mostrar gráfico:\n{str(e)}")
         
         finally:
             self.btn_graficar.config(state=tk.NORMAL, text="Generar Gráfico")
@@ -578,4 +683,58 @@ class ConversorGUI:
             self.periodo_var.set("30")
             
         except Exception as e:
-            print(f"Error al limpiar gráfico: {e}")
\ No newline at end of file
+            print(f"Error al limpiar gráfico: {e}")
+    
+    def _alternar_instrumentacion(self):
+        """Activa o desactiva la medición según las casillas del panel"""
+        REGISTRO.activar(self.instrumentacion_var.get(), spans=self.spans_var.get())
+        self.refrescar_diagnostico()
+    
+    def _reiniciar_diagnostico(self):
+        """Descarta las métricas recolectadas"""
+        REGISTRO.reiniciar()
+        self.refrescar_diagnostico()
+    
+    def refrescar_diagnostico(self):
+        """Muestra el resumen de tiempos por etapa en el panel de diagnóstico"""
+        self.diagnostico_text.delete(1.0, tk.END)
+        if not REGISTRO.activo:
+            self.diagnostico_text.insert(tk.END, "La medición está desactivada. Active 'Medir etapas' y realice conversiones.\n")
+        if REGISTRO.histogramas or REGISTRO.contadores:
+            self.diagnostico_text.insert(tk.END, REGISTRO.obtener_tabla_texto())
+        
+        self.diagnostico_text.insert(tk.END, "\n\nProveedores:\n")
+        for proveedor, estado in self.api.gobernador.estado().items():
+            self.diagnostico_text.insert(tk.END, f"  {proveedor}: circuito {estado['circuito']}, "
+                                                 f"{estado['fallos']} fallos, {estado['tokens']} tokens\n")
+        for aviso in self.api.avisos_respaldo():
+            self.diagnostico_text.insert(tk.END, f"  AVISO: {aviso}\n")
+        
+        cache = CACHE_RESULTADOS.estadisticas()
+        self.diagnostico_text.insert(tk.END, f"\nCache de resultados: {cache['entradas']} entradas, "
+                                             f"{cache['bytes'] / 1024:.1f} de {cache['max_bytes'] / 1024:.0f} KB, "
+                                             f"aciertos {cache['tasa_aciertos']:.1%} "
+                                             f"({cache['aciertos']}/{cache['aciertos'] + cache['fallos']}), "
+                                             f"{cache['desalojos']} desalojos\n")
+        
+        if REGISTRO.spans:
+            self.diagnostico_text.insert(tk.END, "\n\nÚltimas trazas:\n")
+            for span in list(REGISTRO.spans)[-20:]:
+                sangria = "  " if span['padre_id'] else ""
+                self.diagnostico_text.insert(tk.END, f"{sangria}[{span['traza_id']}] {span['nombre']}: "
+                                                     f"{span['duracion_ms']:.3f} ms\n")
+    
+    def exportar_metricas(self, formato):
+        """Guarda las métricas en un archivo JSON o de texto Prometheus"""
+        extension = '.json' if formato == 'json' else '.prom'
+        ruta = filedialog.asksaveasfilename(defaultextension=extension,
+                                            filetypes=[("Métricas", f"*{extension}")])
+        if not ruta:
+            return
+        
+        contenido = REGISTRO.exportar_json() if formato == 'json' else REGISTRO.exportar_prometheus()
+        try:
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                archivo.write(contenido)
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudieron exportar las métricas:\n{e}")
\ No newline at end of file
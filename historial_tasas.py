@@ -0,0 +1,148 @@
+"""
+Historial de Tasas - Almacén indexado por fecha para conversiones a una fecha dada
+"""
+
+import threading
+
+import numpy as np
+
+from grafo_divisas import SinCotizacionError
+
+
+def a_dias(fechas):
+    """Convierte fechas (texto, date, datetime o datetime64) a días desde 1970 como int64"""
+    return np.asarray(fechas, dtype='datetime64[D]').astype(np.int64)
+
+
+class AlmacenTasas:
+    """
+    Series de tasas por par de divisas guardadas como arreglos ordenados por
+    fecha. Una consulta "a la fecha" es una búsqueda binaria (np.searchsorted)
+    que retorna la última tasa publicada hasta ese día, sin usar la red.
+
+    Cada serie (base, codigo) guarda las unidades de codigo por 1 base. Los
+    snapshots de tasas se registran contra USD, y los históricos de la API
+    como el par consultado; los pares sin serie propia se cruzan por USD.
+    """
+
+    def __init__(self, tolerancia_dias=7):
+        self.tolerancia_dias = tolerancia_dias
+        self.series = {}
+        self.version = 0
+        self._bloqueo = threading.Lock()
+
+    def registrar(self, base, codigo, fechas, tasas):
+        """
+        Agrega puntos a la serie (base, codigo). Si una fecha ya existía
+        prevalece el valor nuevo; las tasas inválidas se ignoran.
+        """
+        if base == codigo:
+            return
+        dias = a_dias(fechas).ravel()
+        tasas = np.asarray(tasas, dtype=np.float64).ravel()
+        validas = np.isfinite(tasas) & (tasas > 0)
+        dias, tasas = dias[validas], tasas[validas]
+        if not len(dias):
+            return
+
+        with self._bloqueo:
+            anterior = self.series.get((base, codigo))
+            if anterior is not None:
+                # Lo nuevo va primero para que np.unique conserve su valor en fechas repetidas
+                dias = np.concatenate((dias, anterior[0]))
+                tasas = np.concatenate((tasas, anterior[1]))
+            dias, primeras = np.unique(dias, return_index=True)
+            self.series[(base, codigo)] = (dias, tasas[primeras])
+            self.version += 1
+
+    def registrar_tabla(self, fechas, columnas, base='USD'):
+        """Registra una tabla {codigo: tasas} como la que usa historico.ProveedorReplay"""
+        for codigo, tasas in columnas.items():
+            self.registrar(base, codigo, fechas, tasas)
+
+    def registrar_snapshot(self, fecha, unidades_por_usd):
+        """Registra las tasas vigentes de un día como {codigo: unidades por USD}"""
+        for codigo, tasa in unidades_por_usd.items():
+            self.registrar('USD', codigo, [fecha], [tasa])
+
+    def _buscar(self, serie, dias):
+        """Tasa vigente a cada día (NaN si no hay dato previo dentro de la tolerancia)"""
+        fechas_serie, tasas_serie = serie
+        posiciones = np.searchsorted(fechas_serie, dias, side='right') - 1
+        encontradas = posiciones >= 0
+        posiciones = np.maximum(posiciones, 0)
+
+        resultado = np.where(encontradas, tasas_serie[posiciones], np.nan)
+        if self.tolerancia_dias is not None:
+            resultado[dias - fechas_serie[posiciones] > self.tolerancia_dias] = np.nan
+        return resultado
+
+    def _directa(self, desde, hacia, dias):
+        """Tasa desde -> hacia usando solo la serie del par (o la del par invertido)"""
+        if desde == hacia:
+            return np.ones(len(dias))
+        serie = self.series.get((desde, hacia))
+        if serie is not None:
+            return self._buscar(serie, dias)
+        serie = self.series.get((hacia, desde))
+        if serie is not None:
+            return 1 / self._buscar(serie, dias)
+        return np.full(len(dias), np.nan)
+
+    def tasas_par(self, desde, hacia, fechas):
+        """Tasas de un par a varias fechas; donde no hay serie directa se cruza por USD"""
+        dias = np.atleast_1d(a_dias(fechas))
+        tasas = self._directa(desde, hacia, dias)
+
+        faltantes = np.isnan(tasas)
+        if faltantes.any() and 'USD' not in (desde, hacia):
+            dias_faltantes = dias[faltantes]
+            tasas[faltantes] = (self._directa('USD', hacia, dias_faltantes) /
+                                self._directa('USD', desde, dias_faltantes))
+        return tasas
+
+    def _contra_usd(self, codigos, indices, dias):
+        """Unidades por USD de cada fila, agrupando las filas por divisa"""
+        orden = np.argsort(indices, kind='stable')
+        cortes = np.flatnonzero(np.diff(indices[orden])) + 1
+
+        resultado = np.full(len(indices), np.nan)
+        for filas in np.split(orden, cortes):
+            if len(filas) and 0 <= indices[filas[0]] < len(codigos):
+                resultado[filas] = self._directa('USD', codigos[indices[filas[0]]], dias[filas])
+        return resultado
+
+    def tasas(self, codigos, indices_desde, indices_hacia, fechas):
+        """
+        Versión por columnas de tasas_par: una tasa por fila, con las divisas
+        dadas como índices de la lista codigos (fuera de rango si no existen).
+        Cada fila se cruza por USD con una búsqueda por divisa, no por par;
+        luego las series propias de pares sin USD reemplazan el cruce.
+        """
+        indices_desde = np.asarray(indices_desde)
+        indices_hacia = np.asarray(indices_hacia)
+        dias = a_dias(fechas)
+        tasas = (self._contra_usd(codigos, indices_hacia, dias) /
+                 self._contra_usd(codigos, indices_desde, dias))
+        tasas[(indices_desde == indices_hacia) & (indices_desde < len(codigos))] = 1.0
+
+        posicion = {codigo: i for i, codigo in enumerate(codigos)}
+        for base, codigo in list(self.series):
+            if 'USD' in (base, codigo) or base not in posicion or codigo not in posicion:
+                continue
+            i_base, i_codigo = posicion[base], posicion[codigo]
+            filas = np.flatnonzero(((indices_desde == i_base) & (indices_hacia == i_codigo)) |
+                                   ((indices_desde == i_codigo) & (indices_hacia == i_base)))
+            if len(filas):
+                directas = self._buscar(self.series[(base, codigo)], dias[filas])
+                invertidas = indices_desde[filas] == i_codigo
+                directas[invertidas] = 1 / directas[invertidas]
+                tasas[filas] = np.where(np.isnan(directas), tasas[filas], directas)
+        return tasas
+
+    def tasa(self, desde, hacia, fecha):
+        """Tasa de un par vigente a una fecha; lanza SinCotizacionError si no hay dato"""
+        tasa = self.tasas_par(desde, hacia, [fecha])[0]
+        if np.isnan(tasa):
+            raise SinCotizacionError(f"No hay tasas de {desde} a {hacia} registradas para el {fecha}")
+        return float(tasa)
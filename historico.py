@@ -0,0 +1,190 @@
+"""
+Histórico - Series de tasas sintéticas reproducibles y reproducción de series grabadas
+"""
+
+import csv
+import os
+import sys
+import zlib
+
+import numpy as np
+
+from grammar import MAPEO_DIVISAS
+from grafo_divisas import SinCotizacionError
+
+
+# Volatilidad diaria de referencia (desviación del log-retorno) por tipo de divisa
+VOLATILIDAD = {'fiat': 0.005, 'crypto': 0.035}
+
+TIPOS = {info['code']: info['tipo'] for info in MAPEO_DIVISAS.values()}
+
+
+def volatilidad_par(codigo_desde, codigo_hacia):
+    """Volatilidad del cruce suponiendo que ambas divisas se mueven de forma independiente"""
+    return float(np.hypot(VOLATILIDAD[TIPOS.get(codigo_desde, 'fiat')],
+                          VOLATILIDAD[TIPOS.get(codigo_hacia, 'fiat')]))
+
+
+def fechas_hasta(fin, dias):
+    """Arreglo datetime64[D] con los dias + 1 días que terminan en fin"""
+    fin = np.datetime64(fin if fin is not None else 'today', 'D')
+    return fin - np.arange(dias, -1, -1)
+
+
+def caminata_anclada(valor_final, retornos):
+    """
+    Caminata aleatoria geométrica que termina exactamente en valor_final.
+    retornos tiene una fila por día (y opcionalmente una columna por serie);
+    el resultado tiene una fila más que retornos.
+    """
+    # acumulado[t] = suma de los retornos desde t hasta el final
+    acumulado = np.cumsum(retornos[::-1], axis=0)[::-1]
+    acumulado = np.concatenate((acumulado, np.zeros((1,) + acumulado.shape[1:])), axis=0)
+    return valor_final * np.exp(-acumulado)
+
+
+def a_registros(fechas, tasas):
+    """Convierte columnas de fechas y tasas al formato de APITasasCambio.obtener_historico"""
+    textos = np.datetime_as_string(fechas, unit='D').tolist()
+    objetos = fechas.astype('datetime64[s]').tolist()
+    return [{'fecha': fecha, 'fecha_str': texto, 'tasa': tasa}
+            for fecha, texto, tasa in zip(objetos, textos, tasas.tolist())]
+
+
+def _retornos(codigo_desde, codigo_hacia, dias, semilla):
+    """Log-retornos diarios de un par; dependen solo de la semilla y del par"""
+    generador = np.random.default_rng([semilla, zlib.crc32(f"{codigo_desde}/{codigo_hacia}".encode())])
+    return generador.normal(0, volatilidad_par(codigo_desde, codigo_hacia), dias)
+
+
+def generar_historico(codigo_desde, codigo_hacia, tasa_actual, dias, semilla=0, fin=None):
+    """
+    Serie sintética de un par que termina en su tasa actual. La misma semilla
+    y el mismo par producen siempre la misma serie.
+    """
+    retornos = _retornos(codigo_desde, codigo_hacia, dias, semilla)
+    return a_registros(fechas_hasta(fin, dias), caminata_anclada(tasa_actual, retornos))
+
+
+def generar_series(codigo_desde, tasas_actuales, dias, semilla=0, fin=None):
+    """
+    Versión de generar_historico para una divisa contra varias a la vez.
+    tasas_actuales es {codigo_hacia: tasa}; cada serie coincide con la que
+    generar_historico daría para el mismo par. Retorna (fechas, {codigo: arreglo}).
+    """
+    codigos = list(tasas_actuales)
+    if not codigos:
+        return fechas_hasta(fin, dias), {}
+
+    retornos = np.column_stack([_retornos(codigo_desde, c, dias, semilla) for c in codigos])
+    tabla = caminata_anclada(np.array([tasas_actuales[c] for c in codigos]), retornos)
+    return fechas_hasta(fin, dias), {c: tabla[:, i] for i, c in enumerate(codigos)}
+
+
+def generar_tabla(unidades_por_usd, dias, semilla=0, fin=None):
+    """
+    Genera de una vez la historia de varias divisas frente al USD.
+    unidades_por_usd es {codigo: unidades por USD} con los valores actuales.
+    Retorna (fechas, {codigo: arreglo}).
+    """
+    codigos = [c for c in unidades_por_usd if c != 'USD']
+    actuales = np.array([unidades_por_usd[c] for c in codigos], dtype=np.float64)
+    volatilidades = np.array([VOLATILIDAD[TIPOS.get(c, 'fiat')] for c in codigos])
+
+    generador = np.random.default_rng(semilla)
+    retornos = generador.normal(0, 1, (dias, len(codigos))) * volatilidades
+    tabla = caminata_anclada(actuales, retornos)
+    return fechas_hasta(fin, dias), {c: tabla[:, i] for i, c in enumerate(codigos)}
+
+
+def guardar_tabla(ruta, fechas, columnas):
+    """Guarda una tabla de históricos en .csv o .npz (columnar de NumPy)"""
+    if ruta.endswith('.npz'):
+        np.savez(ruta, fecha=fechas, **columnas)
+        return
+
+    codigos = list(columnas)
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(['fecha'] + codigos)
+        textos = np.datetime_as_string(fechas, unit='D').tolist()
+        valores = np.column_stack([columnas[c] for c in codigos]).tolist() if codigos else [[]] * len(textos)
+        escritor.writerows([texto] + fila for texto, fila in zip(textos, valores))
+
+
+def cargar_tabla(ruta):
+    """Lee una tabla guardada con guardar_tabla (o grabada con el mismo formato)"""
+    if ruta.endswith('.npz'):
+        with np.load(ruta) as datos:
+            columnas = {nombre: datos[nombre] for nombre in datos.files}
+        fechas = columnas.pop('fecha').astype('datetime64[D]')
+    else:
+        with open(ruta, newline='', encoding='utf-8') as archivo:
+            lector = csv.reader(archivo)
+            codigos = next(lector)[1:]
+            filas = list(lector)
+        fechas = np.array([fila[0] for fila in filas], dtype='datetime64[D]')
+        valores = np.array([fila[1:] for fila in filas], dtype=np.float64).reshape(len(filas), len(codigos))
+        columnas = {c: valores[:, i] for i, c in enumerate(codigos)}
+
+    orden = np.argsort(fechas, kind='stable')
+    return fechas[orden], {c: v[orden] for c, v in columnas.items()}
+
+
+class ProveedorReplay:
+    """
+    Sirve históricos desde una tabla grabada en disco, sin red. Cada columna
+    guarda las unidades de una divisa por USD (como el campo rates de las
+    APIs), así que cualquier par se obtiene dividiendo dos columnas.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.fechas, self.columnas = cargar_tabla(ruta)
+
+    def _columna(self, codigo):
+        if codigo == 'USD':
+            return np.ones(len(self.fechas))
+        if codigo not in self.columnas:
+            raise SinCotizacionError(f"{os.path.basename(self.ruta)} no tiene histórico de {codigo}")
+        return self.columnas[codigo]
+
+    def obtener_tabla(self, codigo_desde, codigos_hacia, dias=30, fin=None):
+        """
+        Tasas de codigo_desde contra varias divisas en los últimos dias + 1
+        días grabados hasta fin (por defecto, el último). Las divisas sin
+        columna se omiten. Retorna (fechas, {codigo: arreglo}).
+        """
+        base = self._columna(codigo_desde)
+        fin = self.fechas[-1] if fin is None else np.datetime64(fin, 'D')
+        dentro = (self.fechas <= fin) & (self.fechas >= fin - dias)
+
+        disponibles = [c for c in codigos_hacia if c == 'USD' or c in self.columnas]
+        if not disponibles:
+            return self.fechas[dentro], {}
+        tabla = np.column_stack([self._columna(c)[dentro] for c in disponibles]) / base[dentro, None]
+        return self.fechas[dentro], {c: tabla[:, i] for i, c in enumerate(disponibles)}
+
+    def obtener_historico(self, codigo_desde, codigo_hacia, dias=30, fin=None):
+        """Registros de un par en el formato de APITasasCambio.obtener_historico"""
+        self._columna(codigo_hacia)
+        fechas, columnas = self.obtener_tabla(codigo_desde, [codigo_hacia], dias, fin)
+        return a_registros(fechas, columnas[codigo_hacia])
+
+
+if __name__ == "__main__":
+    # Graba una tabla sintética anclada en las tasas actuales (o las de respaldo sin conexión)
+    if len(sys.argv) < 2:
+        print("Uso: python historico.py <salida.csv|salida.npz> [dias] [semilla]")
+        sys.exit(1)
+
+    from api_client import APITasasCambio
+
+    dias = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    semilla = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    api = APITasasCambio()
+    valores = {codigo: 1 / valor for codigo, valor in api.tasas_en_usd().items()}
+    fechas, columnas = generar_tabla(valores, dias, semilla)
+    guardar_tabla(sys.argv[1], fechas, columnas)
+    print(f"{len(columnas)} divisas x {len(fechas)} días guardadas en {sys.argv[1]}")
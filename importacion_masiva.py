@@ -0,0 +1,286 @@
+"""
+Importación Masiva - Conversión columnar de archivos tabulares
+"""
+
+import csv
+import sys
+from fractions import Fraction
+
+import numpy as np
+
+from registro_divisas import INDICE_CODIGOS, INDICE_DIVISAS
+from api_client import APITasasCambio
+from grafo_divisas import SinCotizacionError
+import historico
+import punto_fijo
+
+
+COLUMNAS_ENTRADA = ('cantidad', 'origen', 'destino')
+
+# Columna opcional: las filas con fecha usan las tasas vigentes ese día
+COLUMNA_FECHA = 'fecha'
+
+# Máscara que leer_columnas agrega cuando hay fechas que no se pudieron leer
+FILAS_INVALIDAS = 'invalidas'
+
+# Códigos en el orden del registro; la posición extra queda para divisas desconocidas
+CODIGOS = list(INDICE_CODIGOS)
+FALTANTE = len(CODIGOS)
+
+
+def a_flotantes(textos):
+    """Convierte una columna de cantidades a float64; las que no son números quedan en NaN"""
+    textos = np.asarray(textos)
+    try:
+        return textos.astype(np.float64)
+    except ValueError:
+        pass
+
+    # Solo se interpretan los valores distintos, no cada fila
+    unicos, inversa = np.unique(np.char.strip(textos.astype(str)), return_inverse=True)
+    valores = np.full(len(unicos), np.nan)
+    for i, texto in enumerate(unicos.tolist()):
+        try:
+            valores[i] = float(texto)
+        except ValueError:
+            continue
+    return valores[inversa.ravel()]
+
+
+def a_fechas(valores):
+    """
+    Convierte una columna de fechas a datetime64[D]. Retorna (fechas, invalidas):
+    las celdas vacías quedan en NaT (tasas actuales) y las que no son fechas
+    también, pero marcadas en invalidas para no confundirlas con las vacías.
+    """
+    valores = np.asarray(valores)
+    if np.issubdtype(valores.dtype, np.datetime64):
+        return valores.astype('datetime64[D]'), np.zeros(valores.shape, dtype=bool)
+
+    # Solo se interpretan los valores distintos, no cada fila
+    unicos, inversa = np.unique(np.char.strip(valores.astype(str)), return_inverse=True)
+    fechas = np.full(len(unicos), 'NaT', dtype='datetime64[D]')
+    invalidas = np.zeros(len(unicos), dtype=bool)
+    for i, texto in enumerate(unicos.tolist()):
+        if not texto:
+            continue
+        try:
+            fechas[i] = np.datetime64(texto, 'D')
+        except ValueError:
+            invalidas[i] = True
+    inversa = inversa.ravel()
+    return fechas[inversa], invalidas[inversa]
+
+
+def leer_columnas(ruta, exacto=False):
+    """
+    Lee un archivo .csv o .npz y retorna las columnas como arreglos.
+    Con exacto=True la cantidad se conserva como texto para no perder
+    precisión antes de escalarla a unidades mínimas; si no, las cantidades
+    mal escritas quedan en NaN. Si el archivo trae la columna fecha se
+    incluye como datetime64[D] (NaT en las celdas vacías), junto con la
+    máscara FILAS_INVALIDAS de las fechas que no se pudieron leer.
+    """
+    convertir_cantidad = (lambda c: c.astype(str)) if exacto else a_flotantes
+
+    if ruta.endswith('.npz'):
+        with np.load(ruta, allow_pickle=False) as datos:
+            nombres = COLUMNAS_ENTRADA + ((COLUMNA_FECHA,) if COLUMNA_FECHA in datos.files else ())
+            columnas = {nombre: datos[nombre] for nombre in nombres}
+        columnas['cantidad'] = convertir_cantidad(columnas['cantidad'])
+        if COLUMNA_FECHA in columnas:
+            columnas[COLUMNA_FECHA], columnas[FILAS_INVALIDAS] = a_fechas(columnas[COLUMNA_FECHA])
+        return columnas
+
+    with open(ruta, newline='', encoding='utf-8') as archivo:
+        lector = csv.reader(archivo)
+        encabezado = [c.strip().lower() for c in next(lector)]
+        nombres = COLUMNAS_ENTRADA + ((COLUMNA_FECHA,) if COLUMNA_FECHA in encabezado else ())
+        indices = [encabezado.index(nombre) for nombre in nombres]
+
+        # Las filas cortas se completan con celdas vacías y quedan como filas inválidas
+        filas = [[fila[i] if i < len(fila) else '' for i in indices] for fila in lector if fila]
+
+    if not filas:
+        return {nombre: np.array([]) for nombre in nombres}
+
+    columnas = dict(zip(nombres, zip(*filas)))
+    columnas = {nombre: np.array(valores) for nombre, valores in columnas.items()}
+    columnas['cantidad'] = convertir_cantidad(columnas['cantidad'])
+    if COLUMNA_FECHA in columnas:
+        columnas[COLUMNA_FECHA], columnas[FILAS_INVALIDAS] = a_fechas(columnas[COLUMNA_FECHA])
+    return columnas
+
+
+def _a_indices(divisas):
+    """Traduce una columna de divisas a índices del registro"""
+    unicas, inversa = np.unique(divisas, return_inverse=True)
+
+    # Solo se resuelven los valores distintos, no cada fila
+    mapa = np.array([INDICE_DIVISAS.get(str(d).strip(), FALTANTE) for d in unicas], dtype=np.intp)
+    return mapa[inversa]
+
+
+def _vector_tasas(valores, tipo):
+    """Arreglo de valores en USD indexado como el registro (NaN si no hay tasa)"""
+    usd = np.full(FALTANTE + 1, np.nan, dtype=tipo)
+    for codigo, valor in valores.items():
+        indice = INDICE_CODIGOS.get(codigo)
+        if indice is not None:
+            usd[indice] = valor
+    return usd
+
+
+def convertir_columnas(cantidades, origenes, destinos, api, exacto=False, fechas=None, invalidas=None):
+    """
+    Convierte columnas completas con las tasas actuales del cliente API.
+    Si se pasa fechas (datetime64[D]), las filas con fecha usan las tasas
+    del historial vigentes ese día y las filas con NaT las actuales. Las
+    filas marcadas en invalidas (p. ej. con una fecha ilegible) quedan sin
+    tasa ni resultado.
+    """
+    if fechas is not None:
+        fechas = np.asarray(fechas, dtype='datetime64[D]')
+    invalidas = (np.zeros(len(origenes), dtype=bool) if invalidas is None
+                 else np.asarray(invalidas, dtype=bool))
+    if exacto:
+        columnas = _convertir_columnas_exacto(cantidades, origenes, destinos, api, fechas, invalidas)
+    else:
+        idx_origen = _a_indices(origenes)
+        idx_destino = _a_indices(destinos)
+        cantidades = np.asarray(cantidades, dtype=np.float64)
+
+        # Las filas con fecha se resuelven en el historial, sin red; las tasas
+        # actuales solo se piden si alguna fila válida no tiene fecha
+        con_fecha = ~np.isnat(fechas) if fechas is not None else np.zeros(len(idx_origen), dtype=bool)
+        actuales = ~con_fecha & ~invalidas
+        tasas = np.full(len(idx_origen), np.nan)
+        if actuales.any():
+            usd = _vector_tasas(api.tasas_en_usd(), np.float64)
+            tasas[actuales] = usd[idx_origen[actuales]] / usd[idx_destino[actuales]]
+        if con_fecha.any():
+            tasas[con_fecha] = api.historial.tasas(CODIGOS, idx_origen[con_fecha],
+                                                   idx_destino[con_fecha], fechas[con_fecha])
+        columnas = {
+            'cantidad': cantidades,
+            'origen': np.asarray(origenes),
+            'destino': np.asarray(destinos),
+            'resultado': cantidades * tasas,
+            'tasa': tasas
+        }
+
+    if fechas is not None:
+        columnas[COLUMNA_FECHA] = fechas
+    return columnas
+
+
+def _valores_en_fecha(api, codigo_desde, codigo_hacia, dia):
+    """Valores exactos de un par a una fecha, en el formato de tasas_en_usd(exacto=True)"""
+    try:
+        tasa = api.historial.tasa(codigo_desde, codigo_hacia, dia)
+    except SinCotizacionError:
+        return {}
+    return {codigo_desde: Fraction(str(tasa)), codigo_hacia: Fraction(1)}
+
+
+def _convertir_columnas_exacto(cantidades, origenes, destinos, api, fechas, invalidas):
+    """Conversión en punto fijo agrupando las filas por par de divisas (y por fecha)"""
+    n = FALTANTE + 1
+
+    cantidades = np.asarray(cantidades, dtype=str)
+    resultados = np.full(cantidades.shape, '', dtype='<U1')
+    tasas = np.full(cantidades.shape, np.nan)
+
+    # Las filas inválidas se agrupan como un par de divisas desconocidas
+    pares = _a_indices(origenes) * n + _a_indices(destinos)
+    pares[invalidas] = FALTANTE * n + FALTANTE
+    if fechas is None:
+        fechas = np.full(pares.shape, 'NaT', dtype='datetime64[D]')
+
+    # Las tasas actuales solo se piden si alguna fila válida no tiene fecha
+    sin_fecha = np.isnat(fechas)
+    valores = api.tasas_en_usd(exacto=True) if (sin_fecha & ~invalidas).any() else {}
+
+    # Clave int64 por par y fecha; el día 0 queda para las filas sin fecha
+    dias = fechas.astype(np.int64)
+    if sin_fecha.all():
+        dias = np.zeros(pares.shape, dtype=np.int64)
+    else:
+        dias = np.where(sin_fecha, 0, dias - dias[~sin_fecha].min() + 1)
+    claves = pares * (dias.max(initial=0) + 1) + dias
+    orden = np.argsort(claves, kind='stable')
+    cortes = np.flatnonzero(np.diff(claves[orden])) + 1
+
+    # Una sola tasa exacta por par y fecha; las filas del grupo se convierten juntas
+    for filas in np.split(orden, cortes):
+        if not len(filas):
+            continue
+        i_desde, i_hacia = divmod(int(pares[filas[0]]), n)
+        if i_desde == FALTANTE or i_hacia == FALTANTE:
+            continue
+
+        codigo_desde, codigo_hacia = CODIGOS[i_desde], CODIGOS[i_hacia]
+        dia = fechas[filas[0]]
+        valores_grupo = valores if np.isnat(dia) else _valores_en_fecha(api, codigo_desde, codigo_hacia, dia)
+        if codigo_desde not in valores_grupo or codigo_hacia not in valores_grupo:
+            continue
+
+        tasa, factor = punto_fijo.factor_conversion(valores_grupo, codigo_desde, codigo_hacia)
+        tasas[filas] = float(tasa)
+
+        # Las cantidades mal escritas dejan su fila sin resultado
+        convertidas, validas = punto_fijo.convertir_cantidades_vector(cantidades[filas], codigo_desde, factor)
+        textos = punto_fijo.a_texto_vector(convertidas[validas], codigo_hacia)
+        if textos.dtype.itemsize > resultados.dtype.itemsize:
+            resultados = resultados.astype(textos.dtype)
+        resultados[filas[validas]] = textos
+
+    return {
+        'cantidad': cantidades,
+        'origen': np.asarray(origenes),
+        'destino': np.asarray(destinos),
+        'resultado': resultados,
+        'tasa': tasas
+    }
+
+
+def escribir_columnas(ruta, columnas):
+    """Escribe las columnas convertidas en .csv o .npz"""
+    if ruta.endswith('.npz'):
+        np.savez(ruta, **columnas)
+        return
+
+    nombres = list(columnas)
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(nombres)
+        escritor.writerows(zip(*(columnas[n].tolist() for n in nombres)))
+
+
+def convertir_archivo(ruta_entrada, ruta_salida, api=None, exacto=False):
+    """Lee, convierte y escribe un archivo tabular sin pasar por el analizador"""
+    api = api or APITasasCambio()
+    entrada = leer_columnas(ruta_entrada, exacto)
+    columnas = convertir_columnas(entrada['cantidad'], entrada['origen'], entrada['destino'],
+                                  api, exacto, entrada.get(COLUMNA_FECHA), entrada.get(FILAS_INVALIDAS))
+    escribir_columnas(ruta_salida, columnas)
+    return len(columnas['cantidad'])
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if a != '--exacto']
+    api = APITasasCambio()
+
+    # --historial <tabla.csv|.npz>: tasas grabadas (como las de historico.py) para las filas con fecha
+    if '--historial' in argumentos[:-1]:
+        i = argumentos.index('--historial')
+        api.historial.registrar_tabla(*historico.cargar_tabla(argumentos[i + 1]))
+        del argumentos[i:i + 2]
+
+    if len(argumentos) != 2:
+        print("Uso: python importacion_masiva.py [--exacto] [--historial <tabla>] "
+              "<entrada.csv|.npz> <salida.csv|.npz>")
+        sys.exit(1)
+
+    total = convertir_archivo(argumentos[0], argumentos[1], api, exacto='--exacto' in sys.argv)
+    print(f"Filas convertidas: {total}")
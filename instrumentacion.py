@@ -0,0 +1,208 @@
+"""
+Instrumentación - Tiempos, contadores y trazas de cada etapa del pipeline
+"""
+
+import functools
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+from tabulate import tabulate
+
+
+# Límites superiores (en segundos) de los buckets de los histogramas
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float('inf'))
+
+
+class _MedicionNula:
+    """Contexto vacío usado cuando la instrumentación está desactivada"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULA = _MedicionNula()
+
+
+class _Medicion:
+    """Mide un bloque y registra su duración, errores y span"""
+
+    def __init__(self, registro, nombre):
+        self.registro = registro
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.span = self.registro._abrir_span(self.nombre)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        duracion = time.perf_counter() - self.inicio
+        self.registro.observar(self.nombre, duracion)
+        if tipo is not None:
+            self.registro.incrementar(f"{self.nombre}.errores")
+        self.registro._cerrar_span(self.span, duracion, tipo)
+        return False
+
+
+class Registro:
+    """
+    Almacén de métricas del proceso. Desactivado por defecto: en ese estado
+    medir() retorna un contexto vacío y los decoradores llaman directo a la
+    función, por lo que el costo es una sola comprobación de atributo.
+    """
+
+    def __init__(self, max_spans=1000):
+        self.activo = False
+        self.spans_activos = False
+        self.contadores = {}
+        self.histogramas = {}
+        self.spans = deque(maxlen=max_spans)
+        self._bloqueo = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def activar(self, activo=True, spans=False):
+        """Activa o desactiva la recolección; spans=True guarda también las trazas"""
+        self.activo = activo
+        self.spans_activos = activo and spans
+
+    def reiniciar(self):
+        """Descarta todas las métricas recolectadas"""
+        with self._bloqueo:
+            self.contadores.clear()
+            self.histogramas.clear()
+            self.spans.clear()
+
+    def medir(self, nombre):
+        """Contexto que mide la duración de un bloque de código"""
+        if not self.activo:
+            return _NULA
+        return _Medicion(self, nombre)
+
+    def incrementar(self, nombre, valor=1):
+        """Suma valor a un contador"""
+        if not self.activo:
+            return
+        with self._bloqueo:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + valor
+
+    def observar(self, nombre, segundos):
+        """Registra una duración en el histograma de la etapa"""
+        with self._bloqueo:
+            histograma = self.histogramas.get(nombre)
+            if histograma is None:
+                histograma = {'buckets': [0] * len(BUCKETS), 'cuenta': 0, 'suma': 0.0, 'maximo': 0.0}
+                self.histogramas[nombre] = histograma
+
+            for i, limite in enumerate(BUCKETS):
+                if segundos <= limite:
+                    histograma['buckets'][i] += 1
+                    break
+            histograma['cuenta'] += 1
+            histograma['suma'] += segundos
+            histograma['maximo'] = max(histograma['maximo'], segundos)
+
+    def _abrir_span(self, nombre):
+        if not self.spans_activos:
+            return None
+
+        pila = getattr(self._local, 'pila', None)
+        if pila is None:
+            pila = self._local.pila = []
+
+        padre = pila[-1] if pila else None
+        span = {
+            'nombre': nombre,
+            'traza_id': padre['traza_id'] if padre else next(self._ids),
+            'span_id': next(self._ids),
+            'padre_id': padre['span_id'] if padre else None,
+            'inicio': time.time(),
+            'hilo': threading.current_thread().name
+        }
+        pila.append(span)
+        return span
+
+    def _cerrar_span(self, span, duracion, tipo_error):
+        if span is None:
+            return
+        self._local.pila.pop()
+        span['duracion_ms'] = duracion * 1000
+        span['error'] = tipo_error.__name__ if tipo_error else None
+        self.spans.append(span)
+
+    def exportar_json(self):
+        """Retorna todas las métricas como texto JSON"""
+        with self._bloqueo:
+            datos = {
+                'contadores': dict(self.contadores),
+                'histogramas': {
+                    nombre: {
+                        'buckets': dict(zip([str(b) for b in BUCKETS], h['buckets'])),
+                        'cuenta': h['cuenta'],
+                        'suma_segundos': h['suma'],
+                        'maximo_segundos': h['maximo']
+                    }
+                    for nombre, h in self.histogramas.items()
+                },
+                'spans': list(self.spans)
+            }
+        return json.dumps(datos, indent=2, ensure_ascii=False)
+
+    def exportar_prometheus(self):
+        """Retorna las métricas en el formato de texto de Prometheus"""
+        lineas = []
+        with self._bloqueo:
+            if self.histogramas:
+                lineas.append('# HELP conversor_etapa_segundos Duración de cada etapa del pipeline')
+                lineas.append('# TYPE conversor_etapa_segundos histogram')
+            for nombre, h in sorted(self.histogramas.items()):
+                acumulado = 0
+                for limite, cuenta in zip(BUCKETS, h['buckets']):
+                    acumulado += cuenta
+                    le = '+Inf' if limite == float('inf') else repr(limite)
+                    lineas.append(f'conversor_etapa_segundos_bucket{{etapa="{nombre}",le="{le}"}} {acumulado}')
+                lineas.append(f'conversor_etapa_segundos_sum{{etapa="{nombre}"}} {h["suma"]}')
+                lineas.append(f'conversor_etapa_segundos_count{{etapa="{nombre}"}} {h["cuenta"]}')
+
+            if self.contadores:
+                lineas.append('# HELP conversor_eventos_total Contadores de eventos')
+                lineas.append('# TYPE conversor_eventos_total counter')
+            for nombre, valor in sorted(self.contadores.items()):
+                lineas.append(f'conversor_eventos_total{{evento="{nombre}"}} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+    def obtener_tabla_texto(self):
+        """Resumen legible de tiempos y contadores para el panel de diagnóstico"""
+        with self._bloqueo:
+            tabla = [[nombre, h['cuenta'], h['suma'] / h['cuenta'] * 1000,
+                      h['maximo'] * 1000, h['suma'] * 1000]
+                     for nombre, h in sorted(self.histogramas.items())]
+            contadores = sorted(self.contadores.items())
+
+        texto = tabulate(tabla, headers=['Etapa', 'Llamadas', 'Media (ms)', 'Máximo (ms)', 'Total (ms)'],
+                         tablefmt='grid', floatfmt='.3f')
+        if contadores:
+            texto += '\n\n' + tabulate(contadores, headers=['Contador', 'Valor'], tablefmt='grid')
+        return texto
+
+
+REGISTRO = Registro()
+
+
+def instrumentado(nombre):
+    """Decorador que mide cada llamada a la función bajo el nombre dado"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not REGISTRO.activo:
+                return funcion(*args, **kwargs)
+            with _Medicion(REGISTRO, nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
@@ -0,0 +1,153 @@
+"""
+Lector en Streaming - Procesamiento por lotes de archivos de estados de cuenta
+"""
+
+import csv
+import mmap
+import os
+import sys
+
+from analizador_sintactico import AnalizadorSintactico, formatear_errores
+from api_client import APITasasCambio
+from grafo_divisas import SinCotizacionError
+import historico
+import punto_fijo
+
+
+TERMINADOR = b'$'
+
+COLUMNAS_SALIDA = ['linea', 'cantidad', 'origen', 'destino', 'fecha', 'resultado', 'tasa', 'error']
+
+
+class LectorStreaming:
+    """Recorre un archivo de sentencias mapeado en memoria sin cargarlo completo"""
+
+    def __init__(self, ruta, tamano_lote=1000):
+        self.ruta = ruta
+        self.tamano_lote = tamano_lote
+
+    def sentencias(self):
+        """Genera (linea, columna, texto) por cada sentencia terminada en '$'"""
+        with open(self.ruta, 'rb') as archivo:
+            if os.fstat(archivo.fileno()).st_size == 0:
+                return
+
+            with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as vista:
+                    inicio = 0
+                    linea = 1
+                    columna = 1
+                    total = len(mm)
+
+                    while inicio < total:
+                        fin = mm.find(TERMINADOR, inicio)
+                        fin = total if fin == -1 else fin + 1
+
+                        # Solo se decodifica la sentencia actual, nunca el archivo; un byte
+                        # inválido queda como U+FFFD y la sentencia se reporta con error
+                        texto = str(vista[inicio:fin], 'utf-8', 'replace')
+                        contenido = texto.lstrip()
+                        prefijo = texto[:len(texto) - len(contenido)]
+                        linea_sentencia = linea + prefijo.count('\n')
+
+                        # Una sentencia puede empezar a mitad de línea, tras la anterior
+                        if '\n' in prefijo:
+                            columna_sentencia = len(prefijo) - prefijo.rfind('\n')
+                        else:
+                            columna_sentencia = columna + len(prefijo)
+                        linea += texto.count('\n')
+                        columna = len(texto) - texto.rfind('\n') if '\n' in texto else columna + len(texto)
+                        inicio = fin
+
+                        contenido = contenido.rstrip()
+                        if contenido:
+                            yield linea_sentencia, columna_sentencia, contenido
+
+    def lotes(self):
+        """Agrupa las sentencias en lotes acotados de tamaño tamano_lote"""
+        lote = []
+        for sentencia in self.sentencias():
+            lote.append(sentencia)
+            if len(lote) >= self.tamano_lote:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+
+def procesar_sentencia(texto, api, exacto=False, linea=1, columna=1):
+    """
+    Ejecuta el análisis sintáctico y la conversión sobre una sentencia.
+    El sintáctico ya reporta las divisas desconocidas, así que las sentencias
+    válidas no pagan un análisis léxico aparte; linea y columna indican dónde
+    empieza la sentencia en el archivo y se usan para las posiciones de los
+    errores.
+    """
+    sintactico = AnalizadorSintactico(texto)
+    if not sintactico.analizar():
+        return {'error': formatear_errores(sintactico.errores, linea, columna).replace('\n', '; ')}
+
+    datos = sintactico.obtener_datos()
+    try:
+        if exacto:
+            resultado = punto_fijo.convertir_exacto(api, datos['cantidad_texto'], datos['origen'],
+                                                    datos['destino'], datos['fecha'])
+            datos['cantidad'] = datos['cantidad_texto']
+        elif datos['fecha']:
+            resultado = api.convertir_en_fecha(datos['cantidad'], datos['origen'], datos['destino'],
+                                               datos['fecha'])
+        else:
+            resultado = api.convertir(datos['cantidad'], datos['origen'], datos['destino'])
+    except SinCotizacionError as e:
+        return {'error': f"Línea {linea}: {e}"}
+    datos.update(resultado=resultado['resultado'], tasa=resultado['tasa'])
+    return datos
+
+
+def procesar_archivo(ruta_entrada, ruta_salida, api=None, tamano_lote=1000, exacto=False):
+    """
+    Convierte un archivo de sentencias escribiendo los resultados en CSV.
+    El lector solo avanza al siguiente lote cuando el anterior ya fue escrito,
+    por lo que la memoria usada depende de tamano_lote y no del archivo.
+    """
+    api = api or APITasasCambio()
+    lector = LectorStreaming(ruta_entrada, tamano_lote)
+    resumen = {'procesadas': 0, 'errores': 0}
+
+    with open(ruta_salida, 'w', newline='', encoding='utf-8') as salida:
+        escritor = csv.writer(salida)
+        escritor.writerow(COLUMNAS_SALIDA)
+
+        for lote in lector.lotes():
+            filas = []
+            for linea, columna, texto in lote:
+                datos = procesar_sentencia(texto, api, exacto, linea, columna)
+                if 'error' in datos:
+                    resumen['errores'] += 1
+                    filas.append([linea, '', '', '', '', '', '', datos['error']])
+                else:
+                    resumen['procesadas'] += 1
+                    filas.append([linea, datos['cantidad'], datos['origen'], datos['destino'],
+                                  datos['fecha'] or '', datos['resultado'], float(datos['tasa']), ''])
+            escritor.writerows(filas)
+            salida.flush()
+
+    return resumen
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if a != '--exacto']
+    api = APITasasCambio()
+
+    # --historial <tabla.csv|.npz>: tasas grabadas para las sentencias "el AAAA-MM-DD"
+    if '--historial' in argumentos[:-1]:
+        i = argumentos.index('--historial')
+        api.historial.registrar_tabla(*historico.cargar_tabla(argumentos[i + 1]))
+        del argumentos[i:i + 2]
+
+    if len(argumentos) != 2:
+        print("Uso: python lector_streaming.py [--exacto] [--historial <tabla>] <entrada> <salida.csv>")
+        sys.exit(1)
+
+    resumen = procesar_archivo(argumentos[0], argumentos[1], api, exacto='--exacto' in sys.argv)
+    print(f"Sentencias convertidas: {resumen['procesadas']} | Con errores: {resumen['errores']}")
@@ -0,0 +1,205 @@
+"""
+Portafolio - Valuación de muchas posiciones en distintas divisas a una moneda de reporte
+"""
+
+import csv
+import sys
+import threading
+
+import numpy as np
+from tabulate import tabulate
+
+from grammar import MAPEO_DIVISAS
+from registro_divisas import DIVISAS, INDICE_CODIGOS, INDICE_DIVISAS
+from api_client import APITasasCambio
+from instrumentacion import REGISTRO, instrumentado
+
+
+CODIGOS = [d['code'] for d in DIVISAS]
+
+
+def a_indices(divisas):
+    """Traduce claves o códigos de divisa a índices del registro; falla si alguna no existe"""
+    unicas, inversa = np.unique(np.asarray(divisas, dtype=str), return_inverse=True)
+    desconocidas = [str(d) for d in unicas if str(d) not in INDICE_DIVISAS]
+    if desconocidas:
+        raise ValueError(f"Divisas desconocidas en el portafolio: {', '.join(desconocidas)}")
+    return np.array([INDICE_DIVISAS[str(d)] for d in unicas], dtype=np.int16)[inversa]
+
+
+def _ampliar(arreglo, capacidad, usados):
+    """Copia las primeras usados filas de arreglo a uno nuevo con la capacidad dada"""
+    nuevo = np.zeros(capacidad, dtype=arreglo.dtype)
+    nuevo[:usados] = arreglo[:usados]
+    return nuevo
+
+
+class Portafolio:
+    """
+    Conjunto de posiciones valuadas en una moneda de reporte. Las cantidades
+    se acumulan por divisa al cargarlas o modificarlas, de modo que valuar
+    cuesta una multiplicación por divisa del registro y no por posición.
+    Ante un cambio de precios en vivo solo se vuelven a leer las tasas de
+    las divisas que cambiaron.
+    """
+
+    def __init__(self, api, moneda='DolarEstadounidense'):
+        self.api = api
+        self.moneda = moneda
+        self.codigo_moneda = MAPEO_DIVISAS[moneda]['code']
+
+        # Una fila por posición: índice de su divisa y cantidad. Los arreglos
+        # duplican su capacidad al llenarse y _largo cuenta las filas usadas
+        self._divisas = np.zeros(0, dtype=np.int16)
+        self._cantidades = np.zeros(0, dtype=np.float64)
+        self._largo = 0
+
+        # Una entrada por divisa del registro
+        self.totales = np.zeros(len(CODIGOS), dtype=np.float64)
+        self.valores = np.full(len(CODIGOS), np.nan, dtype=np.float64)
+        self._version = None
+        self._bloqueo = threading.Lock()
+
+        api.suscribir(self._precios_actualizados)
+
+    def __len__(self):
+        return self._largo
+
+    def cerrar(self):
+        """Deja de recibir los precios en vivo del cliente API"""
+        self.api.desuscribir(self._precios_actualizados)
+
+    def cargar(self, divisas, cantidades):
+        """Agrega muchas posiciones a la vez; retorna los números de fila asignados"""
+        indices = a_indices(divisas)
+        cantidades = np.asarray(cantidades, dtype=np.float64)
+
+        with self._bloqueo:
+            inicio = self._largo
+            fin = inicio + len(cantidades)
+            if fin > len(self._cantidades):
+                capacidad = max(fin, 2 * len(self._cantidades), 16)
+                self._divisas = _ampliar(self._divisas, capacidad, inicio)
+                self._cantidades = _ampliar(self._cantidades, capacidad, inicio)
+            self._divisas[inicio:fin] = indices
+            self._cantidades[inicio:fin] = cantidades
+            self._largo = fin
+            self.totales += np.bincount(indices, weights=cantidades, minlength=len(CODIGOS))
+        return np.arange(inicio, fin)
+
+    def agregar(self, divisa, cantidad):
+        """Agrega una posición y retorna su número de fila"""
+        return int(self.cargar([divisa], [cantidad])[0])
+
+    def actualizar(self, filas, cantidades):
+        """Cambia la cantidad de posiciones existentes ajustando solo sus divisas"""
+        filas = np.atleast_1d(np.asarray(filas, dtype=np.intp))
+        cantidades = np.broadcast_to(np.asarray(cantidades, dtype=np.float64), filas.shape)
+
+        with self._bloqueo:
+            # Con filas repetidas vale la última cantidad, como en una asignación
+            filas, ultimas = np.unique(filas[::-1], return_index=True)
+            cantidades = cantidades[::-1][ultimas]
+
+            usadas = self._cantidades[:self._largo]
+            indices = self._divisas[:self._largo][filas]
+            diferencias = cantidades - usadas[filas]
+            usadas[filas] = cantidades
+            self.totales += np.bincount(indices, weights=diferencias, minlength=len(CODIGOS))
+
+    def eliminar(self, filas):
+        """Deja en cero las posiciones (los números de fila no se reutilizan)"""
+        self.actualizar(filas, 0.0)
+
+    def recalcular(self):
+        """Rehace los totales por divisa desde las posiciones, descartando el error acumulado"""
+        with self._bloqueo:
+            self.totales = np.bincount(self._divisas[:self._largo], weights=self._cantidades[:self._largo],
+                                       minlength=len(CODIGOS)).astype(np.float64)
+
+    def _precios_actualizados(self, codigos):
+        """
+        Suscriptor de APITasasCambio: relee solo las tasas de las divisas
+        que cambiaron. Si entre medio hubo otro cambio de snapshot, o si otras
+        divisas se valúan a través de las que cambiaron (p. ej. la moneda de
+        reporte es una de ellas), se deja que la próxima valuación recargue
+        todas las tasas.
+        """
+        with self._bloqueo:
+            if self._version is None or self.api.version_tasas != self._version + 1:
+                return
+            grafo = self.api.obtener_grafo()
+            if grafo.dependientes(codigos, self.codigo_moneda) - set(codigos):
+                return
+            for codigo, valor in grafo.valores_de(codigos, self.codigo_moneda).items():
+                self.valores[INDICE_CODIGOS[codigo]] = valor
+            self._version = self.api.version_tasas
+        REGISTRO.incrementar('portafolio.revaluaciones_parciales')
+
+    def _asegurar_valores(self):
+        """Recarga las tasas de todas las divisas si el snapshot cambió"""
+        if self._version == self.api.version_tasas:
+            return
+
+        # La versión se lee antes que el grafo: si cambia en medio, la próxima valuación recarga
+        version = self.api.version_tasas
+        grafo = self.api.obtener_grafo()
+        valores = grafo.valores_de(CODIGOS, self.codigo_moneda)
+        with self._bloqueo:
+            self.valores = np.array([valores.get(c, np.nan) for c in CODIGOS], dtype=np.float64)
+            self._version = version
+
+    @instrumentado('portafolio.valuar')
+    def valuar(self):
+        """
+        Valor del portafolio en la moneda de reporte. Las divisas con
+        posiciones pero sin cotización no suman al total y se listan aparte.
+        """
+        self._asegurar_valores()
+        with self._bloqueo:
+            totales = self.totales.copy()
+            valores = self.valores.copy()
+
+        contribuciones = totales * valores
+        con_saldo = totales != 0
+        sin_cotizacion = con_saldo & np.isnan(valores)
+
+        return {
+            'moneda': self.moneda,
+            'total': float(contribuciones[con_saldo & ~sin_cotizacion].sum()),
+            'por_divisa': {
+                CODIGOS[i]: {'cantidad': float(totales[i]), 'valor': float(contribuciones[i])}
+                for i in np.flatnonzero(con_saldo & ~sin_cotizacion)
+            },
+            'sin_cotizacion': [CODIGOS[i] for i in np.flatnonzero(sin_cotizacion)]
+        }
+
+
+def leer_posiciones(ruta):
+    """Lee un CSV con columnas divisa y cantidad"""
+    with open(ruta, newline='', encoding='utf-8') as archivo:
+        lector = csv.reader(archivo)
+        encabezado = [c.strip().lower() for c in next(lector)]
+        i_divisa, i_cantidad = encabezado.index('divisa'), encabezado.index('cantidad')
+        filas = [(fila[i_divisa].strip(), fila[i_cantidad]) for fila in lector if fila]
+
+    divisas, cantidades = zip(*filas) if filas else ((), ())
+    return np.array(divisas, dtype=str), np.array(cantidades, dtype=np.float64)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python portafolio.py <posiciones.csv> [moneda de reporte]")
+        sys.exit(1)
+
+    portafolio = Portafolio(APITasasCambio(), *sys.argv[2:])
+    portafolio.cargar(*leer_posiciones(sys.argv[1]))
+    valuacion = portafolio.valuar()
+
+    filas = sorted(((codigo, d['cantidad'], d['valor']) for codigo, d in valuacion['por_divisa'].items()),
+                   key=lambda fila: -abs(fila[2]))
+    print(tabulate(filas, headers=['Divisa', 'Cantidad', f"Valor ({valuacion['moneda']})"],
+                   floatfmt='.2f', tablefmt='grid'))
+    print(f"{len(portafolio)} posiciones | Total: {valuacion['total']:.2f} {valuacion['moneda']}")
+    if valuacion['sin_cotizacion']:
+        print(f"Sin cotización (excluidas del total): {', '.join(valuacion['sin_cotizacion'])}")
@@ -0,0 +1,276 @@
+"""
+Punto Fijo - Conversión exacta con enteros escalados y redondeo bancario
+"""
+
+from fractions import Fraction
+
+import numpy as np
+
+from grammar import MAPEO_DIVISAS
+from grafo_divisas import SinCotizacionError
+
+
+# Decimales por divisa según el registro (ISO 4217 para fiat, 8 para crypto)
+DECIMALES = {info['code']: info['decimales'] for info in MAPEO_DIVISAS.values()}
+
+LIMITE_INT64 = 2**63 - 1
+
+# Por debajo de este valor un float64 representa exactamente las unidades mínimas
+LIMITE_FLOAT_EXACTO = 2**50
+
+
+def redondear(numerador, denominador):
+    """División entera con redondeo bancario (mitades al par)"""
+    cociente, resto = divmod(numerador, denominador)
+    doble = 2 * resto
+    if doble > denominador or (doble == denominador and cociente % 2):
+        cociente += 1
+    return cociente
+
+
+def redondear_vector(numeradores, denominador):
+    """Versión vectorizada de redondear sobre arreglos int64"""
+    cocientes, restos = np.divmod(numeradores, denominador)
+    return _redondear_restos(cocientes, restos, denominador)
+
+
+def _redondear_restos(cocientes, restos, denominador):
+    """Redondeo bancario de cocientes enteros dados sus restos (0 <= resto < denominador)"""
+    dobles = 2 * restos
+    sube = (dobles > denominador) | ((dobles == denominador) & (cocientes % 2 == 1))
+    return cocientes + sube
+
+
+def a_unidades(texto, codigo):
+    """Convierte una cantidad en texto a unidades mínimas sin pasar por float"""
+    valor = Fraction(str(texto).strip())
+    return redondear(valor.numerator * 10 ** DECIMALES[codigo], valor.denominator)
+
+
+def _unidades_directas(textos, codigo):
+    """
+    Unidades mínimas (int64) de las cantidades escritas como decimal simple
+    ([signo] dígitos [. dígitos]) con a lo sumo DECIMALES[codigo] decimales.
+    Se leen de la matriz de caracteres del arreglo, sin pasar por float ni
+    por objetos de Python. Retorna (unidades, directos); las filas que no son
+    directas (exponentes, más decimales, más de 18 cifras o texto que no es
+    número) quedan en 0.
+    """
+    decimales = DECIMALES[codigo]
+    textos = np.ascontiguousarray(textos, dtype=str).ravel()
+    if textos.dtype.itemsize == 0:
+        textos = textos.astype('<U1')
+    ancho = textos.dtype.itemsize // 4
+    caracteres = textos.view(np.uint32).reshape(len(textos), ancho)
+
+    largos = np.count_nonzero(caracteres, axis=1)
+    negativos = caracteres[:, 0] == ord('-')
+    signos = negativos | (caracteres[:, 0] == ord('+'))
+    digitos = caracteres - np.uint32(ord('0'))
+    es_digito = digitos <= 9
+    es_punto = caracteres == ord('.')
+    puntos = np.count_nonzero(es_punto, axis=1)
+    posiciones = np.where(puntos, np.argmax(es_punto, axis=1), largos)
+    fraccionarias = largos - posiciones - (puntos > 0)
+
+    permitidos = es_digito | es_punto | (caracteres == 0)
+    permitidos[:, 0] |= signos
+    directos = (permitidos.all(axis=1) & (puntos <= 1) & es_digito.any(axis=1) &
+                (fraccionarias <= decimales) & (posiciones - signos + decimales <= 18))
+
+    # Horner columna por columna saltando el punto; luego se completan los decimales
+    unidades = np.zeros(len(textos), dtype=np.int64)
+    for columna in range(ancho):
+        unidades = np.where(es_digito[:, columna], unidades * 10 + digitos[:, columna], unidades)
+    potencias = 10 ** np.arange(19, dtype=np.int64)
+    unidades = np.where(directos, unidades * potencias[np.clip(decimales - fraccionarias, 0, 18)], 0)
+    return np.where(negativos, -unidades, unidades), directos
+
+
+def a_unidades_vector(textos, codigo):
+    """
+    Convierte una columna de cantidades en texto a unidades mínimas (int64).
+    Las cantidades con más decimales de los que admite la divisa (o fuera
+    del rango exacto de float64) usan a_unidades.
+    """
+    textos = np.char.strip(np.asarray(textos, dtype=str))
+    if textos.size == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    unidades, directos = _unidades_directas(textos, codigo)
+    for i in np.flatnonzero(~directos):
+        unidades[i] = a_unidades(textos[i], codigo)
+    return unidades
+
+
+def a_texto(unidades, codigo):
+    """Formatea unidades mínimas como cantidad decimal"""
+    decimales = DECIMALES[codigo]
+    signo = '-' if unidades < 0 else ''
+    entero, fraccion = divmod(abs(int(unidades)), 10 ** decimales)
+    if not decimales:
+        return f"{signo}{entero}"
+    return f"{signo}{entero}.{fraccion:0{decimales}d}"
+
+
+def a_texto_vector(unidades, codigo):
+    """
+    Versión por columnas de a_texto. Las cifras se escriben alineadas a la
+    derecha en una matriz de caracteres, una columna por potencia de 10, que
+    luego se ve como arreglo de texto sin formatear fila por fila; los
+    valores fuera de int64 (dtype object) usan a_texto.
+    """
+    unidades = np.asarray(unidades)
+    if unidades.dtype == object:
+        return np.array([a_texto(u, codigo) for u in unidades.tolist()], dtype=str)
+    if unidades.size == 0:
+        return np.zeros(0, dtype='<U1')
+
+    decimales = DECIMALES[codigo]
+    negativos = unidades < 0
+    absolutos = np.abs(unidades)
+
+    # Cifras sin ceros a la izquierda, pero al menos un cero entero antes del punto
+    potencias = 10 ** np.arange(19, dtype=np.int64)
+    cifras = np.maximum(np.searchsorted(potencias, absolutos, side='right'), decimales + 1)
+    largos = negativos + cifras + (decimales > 0)
+    ancho = int(largos.max())
+
+    caracteres = np.full((len(unidades), ancho), ord(' '), dtype=np.uint32)
+    columna = ancho - 1
+    for rango in range(int(cifras.max())):
+        if decimales and rango == decimales:
+            caracteres[:, columna] = ord('.')
+            columna -= 1
+        absolutos, digitos = np.divmod(absolutos, 10)
+        caracteres[:, columna] = np.where(rango < cifras, ord('0') + digitos, ord(' '))
+        columna -= 1
+
+    caracteres[np.flatnonzero(negativos), ancho - largos[negativos]] = ord('-')
+    return np.char.lstrip(caracteres.view(f'<U{ancho}').ravel(), ' ')
+
+
+def factor_conversion(valores_usd, codigo_desde, codigo_hacia):
+    """
+    Factor exacto que lleva unidades mínimas de una divisa a la otra.
+    valores_usd debe venir de APITasasCambio.tasas_en_usd(exacto=True).
+    """
+    tasa = Fraction(valores_usd[codigo_desde]) / valores_usd[codigo_hacia]
+    return tasa, tasa * Fraction(10) ** (DECIMALES[codigo_hacia] - DECIMALES[codigo_desde])
+
+
+def _multiplicar_dividir(unidades, numerador, denominador):
+    """
+    Cocientes redondeados de unidades * numerador / denominador cuando el
+    producto no cabe en int64. float64 estima el cociente y el resto se
+    calcula en int64 con desborde modular: como el resto verdadero es
+    pequeño, el resultado módulo 2**64 es exacto y corrige la estimación.
+    Retorna (cocientes, exactos); las filas no exactas quedan en 0.
+    """
+    estimados = np.floor(unidades.astype(np.float64) * (numerador / denominador))
+
+    # La estimación se aleja a lo sumo unas ulp del cociente, más uno por el floor
+    errores = np.abs(estimados) * 2.0 ** -50 + 2
+    exactos = (np.abs(estimados) < 2.0 ** 62) & (errores * denominador < 2.0 ** 61)
+    cocientes = np.where(exactos, estimados, 0).astype(np.int64)
+
+    restos = unidades * np.int64(numerador) - cocientes * np.int64(denominador)
+    ajustes, restos = np.divmod(restos, np.int64(denominador))
+    cocientes = _redondear_restos(cocientes + ajustes, restos, np.int64(denominador))
+    return np.where(exactos, cocientes, 0), exactos
+
+
+def convertir_unidades_vector(unidades, factor):
+    """
+    Aplica un factor exacto a un arreglo de unidades mínimas. Si el producto
+    no cabe en int64 se usa _multiplicar_dividir, y solo las filas que ni
+    así son exactas se resuelven con enteros de Python.
+    """
+    unidades = np.asarray(unidades, dtype=np.int64)
+    numerador, denominador = factor.numerator, factor.denominator
+    maximo = int(np.abs(unidades).max()) if unidades.size else 0
+
+    if numerador <= LIMITE_INT64 // max(maximo, 1) and denominador <= LIMITE_INT64 // 2:
+        return redondear_vector(unidades * np.int64(numerador), np.int64(denominador))
+
+    if numerador <= LIMITE_INT64 and denominador <= LIMITE_INT64:
+        convertidas, exactos = _multiplicar_dividir(unidades, numerador, denominador)
+        if exactos.all():
+            return convertidas
+    else:
+        convertidas, exactos = np.zeros_like(unidades), np.zeros(unidades.shape, dtype=bool)
+
+    convertidas = convertidas.astype(object)
+    for i in np.flatnonzero(~exactos):
+        convertidas[i] = redondear(int(unidades[i]) * numerador, denominador)
+    return convertidas
+
+
+def convertir_cantidad(texto, codigo_desde, factor):
+    """
+    Aplica un factor exacto a una cantidad en texto. La cantidad no se
+    redondea a las unidades de origen: se redondea una sola vez, al final,
+    a las unidades mínimas de destino.
+    """
+    valor = Fraction(str(texto).strip()) * 10 ** DECIMALES[codigo_desde] * factor
+    return redondear(valor.numerator, valor.denominator)
+
+
+def convertir_cantidades_vector(textos, codigo_desde, factor):
+    """
+    Versión por columnas de convertir_cantidad. Retorna (convertidas, validas):
+    las cantidades directas pasan por convertir_unidades_vector, el resto se
+    convierte una por una con enteros de Python y las que no son números
+    quedan en 0 con validas en False.
+    """
+    textos = np.char.strip(np.asarray(textos, dtype=str))
+    if textos.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+
+    unidades, directos = _unidades_directas(textos, codigo_desde)
+    convertidas = convertir_unidades_vector(unidades, factor)
+    validas = directos.copy()
+    if directos.all():
+        return convertidas, validas
+
+    restantes = {}
+    for i in np.flatnonzero(~directos):
+        try:
+            restantes[i] = convertir_cantidad(textos[i], codigo_desde, factor)
+        except (ValueError, ZeroDivisionError):
+            continue
+    validas[list(restantes)] = True
+
+    if any(abs(valor) > LIMITE_INT64 for valor in restantes.values()):
+        convertidas = convertidas.astype(object)
+    for i, valor in restantes.items():
+        convertidas[i] = valor
+    return convertidas, validas
+
+
+def convertir_exacto(api, cantidad_texto, desde, hacia, fecha=None):
+    """
+    Equivalente exacto de APITasasCambio.convertir para una sola cantidad.
+    Con fecha se usa la tasa del historial (convertir_en_fecha) tomada como
+    el decimal que la representa.
+    """
+    codigo_desde = MAPEO_DIVISAS[desde]['code']
+    codigo_hacia = MAPEO_DIVISAS[hacia]['code']
+
+    if fecha:
+        tasa_historica = api.historial.tasa(codigo_desde, codigo_hacia, fecha)
+        valores_usd = {codigo_desde: Fraction(str(tasa_historica)), codigo_hacia: Fraction(1)}
+    else:
+        valores_usd = api.tasas_en_usd(exacto=True)
+    for codigo in (codigo_desde, codigo_hacia):
+        if codigo not in valores_usd:
+            raise SinCotizacionError(f"No hay cotizaciones que conecten {codigo} con USD")
+
+    tasa, factor = factor_conversion(valores_usd, codigo_desde, codigo_hacia)
+    unidades = convertir_cantidad(cantidad_texto, codigo_desde, factor)
+
+    return {
+        'resultado': a_texto(unidades, codigo_hacia),
+        'unidades': unidades,
+        'tasa': tasa
+    }
@@ -0,0 +1,68 @@
+"""
+Registro de Divisas - Catálogo único de divisas cargado desde divisas.json
+A partir de él se derivan la gramática, el analizador léxico, los índices
+de los arreglos de tasas y los IDs de los proveedores.
+"""
+
+import json
+import os
+
+
+RUTA_REGISTRO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'divisas.json')
+
+# Decimales por defecto cuando la entrada no los indica
+DECIMALES_POR_TIPO = {'fiat': 2, 'crypto': 8}
+
+
+def cargar_registro(ruta=RUTA_REGISTRO):
+    """Lee y valida el archivo de divisas"""
+    with open(ruta, encoding='utf-8') as archivo:
+        divisas = json.load(archivo)
+
+    claves = set()
+    codigos = set()
+    for divisa in divisas:
+        clave, codigo = divisa['clave'], divisa['code']
+        if not clave.isalpha():
+            raise ValueError(f"La clave '{clave}' solo puede contener letras")
+        if divisa['tipo'] not in DECIMALES_POR_TIPO:
+            raise ValueError(f"Tipo de divisa inválido para {clave}: {divisa['tipo']}")
+        if clave in claves or codigo in codigos:
+            raise ValueError(f"Divisa duplicada en el registro: {clave} ({codigo})")
+        claves.add(clave)
+        codigos.add(codigo)
+
+    return divisas
+
+
+DIVISAS = cargar_registro()
+
+# Clave de la gramática -> información de la divisa
+MAPEO_DIVISAS = {
+    d['clave']: {
+        'code': d['code'],
+        'symbol': d['symbol'],
+        'nombre': d['nombre'],
+        'tipo': d['tipo'],
+        'decimales': d.get('decimales', DECIMALES_POR_TIPO[d['tipo']])
+    }
+    for d in DIVISAS
+}
+
+# Código ISO -> posición en los arreglos de tasas
+INDICE_CODIGOS = {d['code']: i for i, d in enumerate(DIVISAS)}
+
+# Igual que INDICE_CODIGOS pero aceptando también la clave de la gramática (Euro o EUR)
+INDICE_DIVISAS = {**INDICE_CODIGOS, **{d['clave']: i for i, d in enumerate(DIVISAS)}}
+
+# Divisas destacadas en la interfaz (p. ej. para los gráficos comparativos)
+PRINCIPALES = [d['clave'] for d in DIVISAS if d.get('principal')]
+
+# Código -> ID de CoinGecko
+CRYPTO_IDS = {d['code']: d['coingecko'] for d in DIVISAS if d.get('coingecko')}
+
+# Tasas de respaldo: unidades por USD para fiat, USD por unidad para crypto
+TASAS_RESPALDO = {d['code']: d['respaldo'] for d in DIVISAS
+                  if d['tipo'] == 'fiat' and 'respaldo' in d}
+PRECIOS_RESPALDO = {d['code']: d['respaldo'] for d in DIVISAS
+                    if d['tipo'] == 'crypto' and 'respaldo' in d}
@@ -0,0 +1,127 @@
+"""
+Sugerencias - Búsqueda aproximada de divisas para mensajes de error
+"""
+
+import bisect
+
+from grammar import MAPEO_DIVISAS
+
+
+def distancia(a, b):
+    """Distancia de Levenshtein entre dos cadenas"""
+    if len(a) < len(b):
+        a, b = b, a
+
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = actual
+    return anterior[-1]
+
+
+def tolerancia(palabra):
+    """
+    Errores tipográficos admitidos según la longitud de la palabra. Con menos
+    de 3 letras no se admite ninguno: cualquier token de un carácter estaría
+    a un error de "a".
+    """
+    if len(palabra) < 3:
+        return 0
+    return max(1, len(palabra) // 3)
+
+
+def es_parecida(palabra, objetivo):
+    """Indica si palabra parece una versión mal escrita de objetivo"""
+    return distancia(palabra.lower(), objetivo.lower()) <= tolerancia(objetivo)
+
+
+class ArbolBK:
+    """
+    Árbol BK sobre una métrica de distancia. Por la desigualdad triangular,
+    una consulta con tolerancia t solo desciende por las ramas cuya distancia
+    al nodo está en [d - t, d + t], así que no se compara contra todo el catálogo.
+    """
+
+    def __init__(self):
+        self.raiz = None
+
+    def agregar(self, termino, valor):
+        if self.raiz is None:
+            self.raiz = (termino, [valor], {})
+            return
+
+        nodo = self.raiz
+        while True:
+            d = distancia(termino, nodo[0])
+            if d == 0:
+                if valor not in nodo[1]:
+                    nodo[1].append(valor)
+                return
+            if d not in nodo[2]:
+                nodo[2][d] = (termino, [valor], {})
+                return
+            nodo = nodo[2][d]
+
+    def buscar(self, termino, limite):
+        """Retorna [(distancia, valor)] de los términos a distancia a lo sumo limite"""
+        encontrados = []
+        pendientes = [self.raiz] if self.raiz else []
+        while pendientes:
+            nodo = pendientes.pop()
+            d = distancia(termino, nodo[0])
+            if d <= limite:
+                encontrados.extend((d, valor) for valor in nodo[1])
+            for arista, hijo in nodo[2].items():
+                if d - limite <= arista <= d + limite:
+                    pendientes.append(hijo)
+        return encontrados
+
+
+_indice = None
+_claves_ordenadas = None
+
+
+def obtener_indice():
+    """Índice compartido sobre claves y códigos; se construye la primera vez que hay un error"""
+    global _indice, _claves_ordenadas
+    if _indice is None:
+        _indice = ArbolBK()
+        for clave, info in MAPEO_DIVISAS.items():
+            _indice.agregar(clave.lower(), clave)
+            _indice.agregar(info['code'].lower(), clave)
+        _claves_ordenadas = sorted((clave.lower(), clave) for clave in MAPEO_DIVISAS)
+    return _indice
+
+
+def _con_prefijo(prefijo):
+    """Claves que empiezan por prefijo ("Lempira" -> "LempiraHondureño")"""
+    obtener_indice()
+    inicio = bisect.bisect_left(_claves_ordenadas, (prefijo,))
+    claves = []
+    for minuscula, clave in _claves_ordenadas[inicio:]:
+        if not minuscula.startswith(prefijo):
+            break
+        claves.append(clave)
+    return claves
+
+
+def sugerir_divisas(palabra, maximo=3):
+    """Claves de divisas parecidas a palabra, de la más cercana a la más lejana"""
+    palabra = palabra.lower()
+    limite = tolerancia(palabra)
+
+    mejores = {}
+    for d, clave in obtener_indice().buscar(palabra, limite):
+        if d < mejores.get(clave, limite + 1):
+            mejores[clave] = d
+
+    # Una palabra incompleta ("Yen" de "YenJapones") cuenta como un solo error
+    # y, a igual distancia, un prefijo es mejor candidato que otro término
+    if len(palabra) >= 3:
+        for clave in _con_prefijo(palabra):
+            mejores[clave] = min(mejores.get(clave, 1), 1)
+
+    orden = sorted(mejores, key=lambda c: (mejores[c], not c.lower().startswith(palabra), c))
+    return orden[:maximo]